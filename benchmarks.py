@@ -0,0 +1,185 @@
+"""Microbenchmarks for the hot-path primitives of SimpleSolver.
+
+Run with `make bench` to compare against the stored baseline, or directly:
+
+    python benchmarks.py [--compare BASELINE] [--save OUTPUT] [--threshold 0.25]
+
+Each benchmark is timed in several rounds and summarised in nanoseconds per
+operation. When comparing, the exit status is non-zero if any benchmark is slower than
+its baseline by more than the threshold. The fastest round is compared rather than the
+median, since it is the least affected by other load on the machine.
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import timeit
+from functools import partial
+
+import numpy as np
+
+from cipher_solver.consts import STANDARD_ALPHABET_SIZE
+from cipher_solver.simple import SimpleSolver
+from cipher_solver.utils import (
+    alphabetical_to_common_key,
+    common_to_alphabetical_key,
+    encrypt,
+)
+
+# Text lengths to run the text dependent benchmarks for.
+TEXT_LENGTHS = (100, 1000, 10000)
+
+# Minimum total time in seconds of each timing round.
+ROUND_TIME = 0.1
+
+# Default relative slowdown of the fastest round compared to the baseline that fails a
+# run.
+REGRESSION_THRESHOLD = 0.25
+
+CIPHERTEXT_PATH = "texts/26_char_key/ciphertexts/ciphertext_frankenstein_sample.txt"
+ALPHABETICAL_KEY = "jhdxmuvpltbwnayzscrefqogik"
+
+
+def get_text(length):
+    """Return the sample ciphertext repeated or cut to the passed length."""
+
+    with open(CIPHERTEXT_PATH) as f:
+        sample = f.read()
+
+    return (sample * (length // len(sample) + 1))[:length]
+
+
+def get_benchmarks():
+    """Return a dict mapping benchmark names to functions to time."""
+
+    benchmarks = {}
+
+    for length in TEXT_LENGTHS:
+        text = get_text(length)
+        s = SimpleSolver(text)
+
+        benchmarks[f"get_digram_matrix[{length}]"] = partial(s._get_digram_matrix, text)
+        benchmarks[f"get_plaintext[{length}]"] = partial(
+            s._get_plaintext, s._decryption_key
+        )
+        benchmarks[f"encrypt[{length}]"] = partial(encrypt, text, ALPHABETICAL_KEY)
+
+    s = SimpleSolver(get_text(1000))
+    matrix = s._get_digram_matrix(s.plaintext())
+    swap_buffer = np.empty(STANDARD_ALPHABET_SIZE)
+
+    benchmarks["score"] = partial(s._score, matrix)
+    benchmarks["swap_matrix"] = partial(s._swap_matrix, matrix, 3, 17)
+    benchmarks["swap_matrix_buffered"] = partial(
+        s._swap_matrix, matrix, 3, 17, buffer=swap_buffer
+    )
+    benchmarks["weighted_random_index_pair"] = s._weighted_random_index_pair
+
+    common_key = "".join(s._decryption_key)
+    benchmarks["common_to_alphabetical_key"] = partial(
+        common_to_alphabetical_key, common_key
+    )
+    benchmarks["alphabetical_to_common_key"] = partial(
+        alphabetical_to_common_key, ALPHABETICAL_KEY
+    )
+
+    return benchmarks
+
+
+def measure(function, rounds):
+    """Time a function and summarise the results.
+
+    Parameters
+    ----------
+    function : callable
+        The function to time, called without arguments.
+    rounds : int
+        The number of timing rounds.
+
+    Returns
+    -------
+    summary : dict
+        The "median", "mean", "stdev" and "min" time per call in nanoseconds, and the
+        number of "calls" per round.
+    """
+
+    timer = timeit.Timer(function)
+
+    # Find the number of calls that makes a round last at least ROUND_TIME.
+    calls, _ = timer.autorange()
+    calls = max(1, int(calls * ROUND_TIME / 0.2))
+
+    times = [1e9 * t / calls for t in timer.repeat(repeat=rounds, number=calls)]
+
+    return {
+        "median": statistics.median(times),
+        "mean": statistics.mean(times),
+        "stdev": statistics.stdev(times) if len(times) > 1 else 0.0,
+        "min": min(times),
+        "calls": calls,
+    }
+
+
+def compare(results, baseline, threshold):
+    """Return the names of benchmarks whose fastest round regressed too much."""
+
+    return [
+        name
+        for name, summary in results.items()
+        if name in baseline and summary["min"] > baseline[name]["min"] * (1 + threshold)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--compare", help="baseline JSON file to compare against")
+    parser.add_argument("--save", help="JSON file to save the results to")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=REGRESSION_THRESHOLD,
+        help="relative slowdown that counts as a regression",
+    )
+    parser.add_argument("--rounds", type=int, default=7, help="timing rounds")
+    parser.add_argument("--filter", default="", help="only run matching benchmarks")
+    args = parser.parse_args()
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    results = {}
+
+    print(f"{'benchmark':36} {'median ns':>12} {'stdev':>10} {'min':>12} {'change':>8}")
+
+    for name, function in get_benchmarks().items():
+        if args.filter not in name:
+            continue
+
+        summary = measure(function, args.rounds)
+        results[name] = summary
+
+        change = ""
+        if name in baseline:
+            change = f"{summary['min'] / baseline[name]['min'] - 1:+.0%}"
+
+        print(
+            f"{name:36} {summary['median']:12.0f} {summary['stdev']:10.0f} "
+            f"{summary['min']:12.0f} {change:>8}"
+        )
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write("\n")
+
+    regressions = compare(results, baseline, args.threshold)
+
+    if regressions:
+        sys.exit(f"Regressions beyond {args.threshold:.0%}: {', '.join(regressions)}")
+
+
+if __name__ == "__main__":
+    main()
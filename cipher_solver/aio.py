@@ -0,0 +1,155 @@
+import asyncio
+import threading
+
+from cipher_solver.simple import SolveCancelled
+
+# Marks the end of the progress events of a solve.
+_DONE = object()
+
+
+class AsyncSolve:
+    """A solve running in an executor, for use from asyncio code.
+
+    Awaiting it returns the alphabetical decryption key once the solve is done, and
+    iterating over it with `async for` yields the progress events of the solve, see
+    SimpleSolver.solve(), until it is done. Cancelling it, or cancelling the task
+    awaiting it, stops the search within PROGRESS_INTERVAL iterations, so the CPU is
+    freed right away rather than when the solve would have finished.
+
+    Used as an async context manager, the solve is cancelled when leaving the block,
+    unless it is done by then, so a request that is abandoned or superseded by a newer
+    one never keeps solving in the background.
+    """
+
+    def __init__(self, solver, executor=None, **solve_arguments):
+        """Start solving in an executor. Use solve_async() instead.
+
+        Parameters
+        ----------
+        solver : cipher_solver.simple.SimpleSolver
+            The solver to run. It should not be used elsewhere until the solve is
+            done.
+        executor : concurrent.futures.ThreadPoolExecutor
+            The executor to run the solve in. Defaults to the default executor of the
+            running event loop. It must run the solve in a thread of this process,
+            for the cancellation token and the progress events to reach it.
+        **solve_arguments
+            Arguments passed on to SimpleSolver.solve().
+        """
+
+        self._cancel_token = threading.Event()
+
+        loop = asyncio.get_running_loop()
+        self._events = asyncio.Queue()
+
+        def report(event):
+            loop.call_soon_threadsafe(self._events.put_nowait, event)
+
+        def solve():
+            try:
+                solver.solve(
+                    cancel_token=self._cancel_token, progress=report, **solve_arguments
+                )
+            except SolveCancelled:
+                return None
+
+            return solver.decryption_key()
+
+        self._future = loop.run_in_executor(executor, solve)
+        self._future.add_done_callback(lambda _: self._events.put_nowait(_DONE))
+
+    def cancel(self):
+        """Stop the solve as soon as possible."""
+
+        self._cancel_token.set()
+
+    def cancelled(self):
+        """Return whether the solve was stopped before it was done."""
+
+        return (
+            self._future.done()
+            and self._future.exception() is None
+            and self._future.result() is None
+        )
+
+    def done(self):
+        """Return whether the solve is done, or stopped."""
+
+        return self._future.done()
+
+    async def result(self):
+        """Wait for the solve to be done.
+
+        Returns
+        -------
+        decryption_key : str
+            The alphabetical decryption key found.
+
+        Raises
+        ------
+        asyncio.CancelledError
+            If the solve was cancelled, or the awaiting task is cancelled, which
+            cancels the solve too.
+        """
+
+        try:
+            decryption_key = await asyncio.shield(self._future)
+        except asyncio.CancelledError:
+            self.cancel()
+            raise
+
+        if decryption_key is None:
+            raise asyncio.CancelledError()
+
+        return decryption_key
+
+    def __await__(self):
+        return self.result().__await__()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        event = await self._events.get()
+
+        if event is _DONE:
+            # Let other iterations end too.
+            self._events.put_nowait(_DONE)
+            raise StopAsyncIteration
+
+        return event
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        if not self.done():
+            self.cancel()
+
+            # Wait for the search to stop, so the solver can be used again.
+            await asyncio.wait([self._future])
+
+
+def solve_async(solver, executor=None, **solve_arguments):
+    """Start solving a cipher without blocking the event loop.
+
+    Must be called from a coroutine, or another function running in an event loop.
+
+    Parameters
+    ----------
+    solver : cipher_solver.simple.SimpleSolver
+        The solver to run.
+    executor : concurrent.futures.ThreadPoolExecutor
+        The executor to run the solve in. Defaults to the default executor of the
+        running event loop.
+    **solve_arguments
+        Arguments passed on to SimpleSolver.solve(), e.g. method and restarts.
+
+    Returns
+    -------
+    solve : AsyncSolve
+        The running solve, which can be awaited for the decryption key, iterated
+        over for progress events, and cancelled.
+    """
+
+    return AsyncSolve(solver, executor, **solve_arguments)
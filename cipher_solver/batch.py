@@ -0,0 +1,454 @@
+import glob
+import json
+import multiprocessing
+import os
+import time
+
+import numpy as np
+
+from cipher_solver.patterns import PatternIndex
+from cipher_solver.shared import SharedModel
+from cipher_solver.simple import SimpleSolver
+from cipher_solver.triage import classify
+from cipher_solver.verify import WordVerifier
+
+# Name of the manifest file of completed inputs when writing results to a directory.
+MANIFEST_NAME = "manifest.jsonl"
+
+# Minimum number of seconds between progress reports.
+PROGRESS_INTERVAL = 1.0
+
+# The language model shared by the parent process, in worker processes.
+_worker_model = None
+
+# The index and the verifier of the default word list, built on first use and then
+# kept for all files solved by the process.
+_pattern_index = PatternIndex()
+_word_verifier = WordVerifier()
+
+
+def find_input_files(pattern, exclude=()):
+    """Find the files to solve for a directory or glob pattern.
+
+    Parameters
+    ----------
+    pattern : str
+        A directory, which is searched recursively, or a glob pattern.
+    exclude : iterable
+        Files and directories to leave out, e.g. an output inside the input
+        directory, so that results are never taken for inputs.
+
+    Returns
+    -------
+    paths : list
+        The sorted absolute paths of all matching files. Manifests record these, so
+        the same file is recognized whatever directory a run is started from.
+    """
+
+    if os.path.isdir(pattern):
+        paths = []
+        for root, _, filenames in os.walk(pattern):
+            paths.extend(os.path.join(root, filename) for filename in filenames)
+    else:
+        paths = glob.glob(pattern, recursive=True)
+
+    excluded = [os.path.abspath(path) for path in exclude]
+
+    def is_excluded(path):
+        return any(path == e or path.startswith(e + os.sep) for e in excluded)
+
+    return sorted(
+        path
+        for path in map(os.path.abspath, paths)
+        if os.path.isfile(path) and not is_excluded(path)
+    )
+
+
+def read_manifest(path):
+    """Return the input paths recorded as completed in a manifest file.
+
+    Parameters
+    ----------
+    path : str
+        Path to a JSON lines file of results. It does not need to exist.
+
+    Returns
+    -------
+    completed_paths : set
+        The absolute "path" of every complete line in the file without an "error",
+        so that files which could not be solved, e.g. because they were still being
+        written, are tried again. Relative paths, recorded by earlier versions, are
+        taken relative to the working directory.
+    """
+
+    completed_paths = set()
+
+    if not os.path.exists(path):
+        return completed_paths
+
+    with open(path) as f:
+        for line in f:
+            # The last line may be incomplete if an earlier run was interrupted.
+            try:
+                result = json.loads(line)
+                path = os.path.abspath(result["path"])
+            except (ValueError, KeyError):
+                continue
+
+            if "error" not in result:
+                completed_paths.add(path)
+
+    return completed_paths
+
+
+def open_manifest(path):
+    """Open a manifest file for appending results.
+
+    If an earlier run was interrupted while writing a line, the line is terminated so
+    that new results start on a line of their own.
+
+    Parameters
+    ----------
+    path : str
+        Path to a JSON lines file of results. It does not need to exist.
+
+    Returns
+    -------
+    manifest : file object
+        The manifest file, opened for appending.
+    """
+
+    manifest = open(path, "a+")
+
+    if manifest.tell() > 0:
+        manifest.seek(manifest.tell() - 1)
+        if manifest.read(1) != "\n":
+            manifest.write("\n")
+
+    return manifest
+
+
+def get_output_paths(output):
+    """Return where to record results for an output argument, see run_batch().
+
+    Parameters
+    ----------
+    output : str
+        Either a path ending in ".jsonl", or a directory, which is created if needed.
+
+    Returns
+    -------
+    manifest_path : str
+        The JSON lines file to record results in.
+    output_directory : str
+        The directory to write plaintext files to, or None to keep them in the
+        manifest.
+    """
+
+    if output.endswith(".jsonl"):
+        return output, None
+
+    os.makedirs(output, exist_ok=True)
+
+    return os.path.join(output, MANIFEST_NAME), output
+
+
+def solve_file(
+    path,
+    method="random",
+    restarts=1,
+    verify=False,
+    triage=False,
+    seed_words=False,
+    score_cache_size=0,
+    model=None,
+):
+    """Solve the ciphertext in a file.
+
+    Parameters
+    ----------
+    path : str
+        Path to the ciphertext file.
+    method : str
+        The solve method, see SimpleSolver.solve().
+    restarts : int
+        The maximum number of times to run the solver, see SimpleSolver.solve().
+    verify : bool
+        Whether to stop restarting as soon as the plaintext is verified with the
+        default word list.
+    triage : bool
+        Whether to classify the ciphertext first, see cipher_solver.triage, and
+        skip solving it unless it is plausibly a substitution of English.
+    seed_words : bool
+        Whether to start from the letters implied by the words of the ciphertext
+        that are in the default word list, see cipher_solver.patterns.
+    score_cache_size : int
+        The number of key scores to remember, so that keys seen in earlier restarts
+        are not scored again, see SimpleSolver.
+    model : mapping
+        Optional language model tables, see SimpleSolver.
+
+    Returns
+    -------
+    result : dict
+        The input "path", the solve time in "seconds", and either the alphabetical
+        "decryption_key", the "plaintext" and the solver "statistics", see
+        SimpleSolver.statistics(), or an "error" message if the file could not be
+        solved. With triage, also the "triage" classification, and "skipped" with
+        its label instead of a solution if the file was not solved.
+    """
+
+    start_time = time.perf_counter()
+
+    try:
+        with open(path) as f:
+            ciphertext = f.read().strip()
+
+        classification = classify(ciphertext) if triage else None
+
+        if classification is not None and not classification["plausible"]:
+            result = {"skipped": classification["label"], "triage": classification}
+        else:
+            s = SimpleSolver(
+                ciphertext,
+                model=model,
+                score_cache_size=score_cache_size,
+                pattern_index=_pattern_index if seed_words else None,
+            )
+            s.solve(
+                method=method,
+                restarts=restarts,
+                verifier=_word_verifier if verify else None,
+            )
+            result = {
+                "decryption_key": s.decryption_key(),
+                "plaintext": s.plaintext(),
+                "statistics": s.statistics(),
+            }
+            if classification is not None:
+                result["triage"] = classification
+    except (OSError, ValueError) as e:
+        result = {"error": str(e)}
+
+    return {
+        "path": path,
+        "seconds": time.perf_counter() - start_time,
+        **result,
+    }
+
+
+def _init_worker(model):
+    """Keep the shared language model for use by solve_file() in a worker process."""
+
+    global _worker_model
+    _worker_model = model
+
+
+def _solve_file(args):
+    """Unpack arguments for solve_file(), for use with multiprocessing pools."""
+
+    return solve_file(*args, model=_worker_model)
+
+
+def record_result(result, manifest, output_directory, root):
+    """Write a result to the manifest, and its plaintext to a file if requested.
+
+    Parameters
+    ----------
+    result : dict
+        A result from solve_file().
+    manifest : file object
+        The manifest to append the result to, see open_manifest().
+    output_directory : str
+        The directory to write the plaintext to, or None to keep it in the manifest.
+    root : str
+        The directory that plaintext file paths are made relative to, so that they
+        mirror the input file paths below it.
+    """
+
+    if output_directory is not None and "plaintext" in result:
+        plaintext_path = os.path.join(
+            output_directory, os.path.relpath(result["path"], root)
+        )
+        os.makedirs(os.path.dirname(plaintext_path), exist_ok=True)
+        with open(plaintext_path, "w") as f:
+            f.write(result.pop("plaintext"))
+        result["output_path"] = plaintext_path
+
+    manifest.write(json.dumps(result) + "\n")
+    manifest.flush()
+
+
+class BatchProgress:
+    """Throughput and latency statistics of a batch run."""
+
+    def __init__(self, total):
+        """Create new progress tracker.
+
+        Parameters
+        ----------
+        total : int
+            The number of files to solve in this run.
+        """
+
+        self.total = total
+        self.latencies = []
+        self.num_errors = 0
+        self.num_skipped = 0
+        self._start_time = time.perf_counter()
+
+    def add(self, result):
+        """Record the result of solving a file.
+
+        Parameters
+        ----------
+        result : dict
+            A result from solve_file().
+        """
+
+        self.latencies.append(result["seconds"])
+
+        if "error" in result:
+            self.num_errors += 1
+
+        if "skipped" in result:
+            self.num_skipped += 1
+
+    def files_per_second(self):
+        """Return the number of files solved per second so far."""
+
+        elapsed = time.perf_counter() - self._start_time
+        return len(self.latencies) / elapsed if elapsed > 0 else 0.0
+
+    def latency_percentiles(self, percentiles=(50, 90, 99)):
+        """Return per-file solve latency percentiles in seconds.
+
+        Parameters
+        ----------
+        percentiles : tuple
+            The percentiles to compute.
+
+        Returns
+        -------
+        latencies : dict
+            Maps each percentile to its latency, empty if no files are solved yet.
+        """
+
+        if not self.latencies:
+            return {}
+
+        values = np.percentile(self.latencies, percentiles)
+        return dict(zip(percentiles, values.tolist()))
+
+    def report(self):
+        """Return a one-line summary of the progress."""
+
+        latencies = ", ".join(
+            f"p{percentile} {latency:.3f}s"
+            for percentile, latency in self.latency_percentiles().items()
+        )
+
+        return (
+            f"{len(self.latencies)}/{self.total} files, "
+            f"{self.files_per_second():.1f} files/s, "
+            f"{self.num_errors} errors"
+            + (f", {self.num_skipped} skipped" if self.num_skipped else "")
+            + (f", latency {latencies}" if latencies else "")
+        )
+
+
+def run_batch(
+    pattern,
+    output,
+    method="random",
+    restarts=1,
+    verify=False,
+    triage=False,
+    seed_words=False,
+    score_cache_size=0,
+    workers=None,
+    report=None,
+    metrics=None,
+):
+    """Solve all files matching a directory or glob pattern, in parallel.
+
+    Results are appended to a manifest as each file is solved, and files already in
+    the manifest are skipped, so an interrupted run can be resumed by running it
+    again with the same arguments. The language model is published in shared memory
+    once, for all worker processes to use without copies of their own.
+
+    Parameters
+    ----------
+    pattern : str
+        A directory, which is searched recursively, or a glob pattern.
+    output : str
+        Either a path ending in ".jsonl", to write one JSON line per file including
+        the plaintext, or a directory, to write each plaintext to a file with the same
+        name as its ciphertext file and record the rest in MANIFEST_NAME.
+    method : str
+        The solve method, see SimpleSolver.solve().
+    restarts : int
+        The maximum number of times to run the solver per file.
+    verify : bool
+        Whether to stop restarting as soon as a plaintext is verified.
+    triage : bool
+        Whether to skip files that are not plausibly substitutions of English, see
+        solve_file().
+    seed_words : bool
+        Whether to start solving from the letters implied by known words, see
+        solve_file().
+    score_cache_size : int
+        The number of key scores to remember per file, see solve_file().
+    workers : int
+        The number of worker processes. Defaults to the number of CPUs.
+    report : callable
+        Optional function called with a one-line progress summary at most every
+        PROGRESS_INTERVAL seconds, and once when done.
+    metrics : cipher_solver.metrics.SolverMetrics
+        Optional metrics to update with each result and the number of files left.
+
+    Returns
+    -------
+    progress : BatchProgress
+        Statistics of the files solved in this run.
+    """
+
+    manifest_path, output_directory = get_output_paths(output)
+
+    input_paths = find_input_files(pattern, exclude=[output])
+    completed_paths = read_manifest(manifest_path)
+    paths = [path for path in input_paths if path not in completed_paths]
+
+    # Plaintext files are named relative to the inputs' common directory.
+    root = os.path.commonpath([os.path.dirname(path) for path in input_paths] or ["."])
+
+    progress = BatchProgress(len(paths))
+    last_report_time = time.perf_counter()
+
+    tasks = [
+        (path, method, restarts, verify, triage, seed_words, score_cache_size)
+        for path in paths
+    ]
+
+    if metrics is not None:
+        metrics.set_queue_depth(len(paths))
+
+    with SharedModel.publish() as model, open_manifest(manifest_path) as manifest:
+        with multiprocessing.Pool(workers, _init_worker, (model,)) as pool:
+            for result in pool.imap_unordered(_solve_file, tasks):
+                record_result(result, manifest, output_directory, root)
+                progress.add(result)
+
+                if metrics is not None:
+                    metrics.record(result)
+                    metrics.set_queue_depth(progress.total - len(progress.latencies))
+
+                now = time.perf_counter()
+                if report is not None and now - last_report_time >= PROGRESS_INTERVAL:
+                    report(progress.report())
+                    last_report_time = now
+
+    if report is not None:
+        report(progress.report())
+
+    return progress
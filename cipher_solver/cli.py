@@ -1,24 +1,265 @@
 #!/usr/bin/env python
 # encoding: utf-8
 
+import argparse
 import os
 import sys
 
+from cipher_solver.batch import run_batch
+from cipher_solver.metrics import SolverMetrics
+from cipher_solver.patterns import PatternIndex
 from cipher_solver.simple import SimpleSolver
+from cipher_solver.workqueue import STALE_CLAIM_TIMEOUT, collect, run_workers, submit
+
+
+def add_metrics_arguments(parser):
+    """Add the options for exporting metrics to an argument parser."""
+
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        default=None,
+        help="serve Prometheus metrics on this local port",
+    )
+    parser.add_argument(
+        "--metrics-file",
+        default=None,
+        help="write Prometheus metrics to this file with each progress report",
+    )
+
+
+def start_metrics(args):
+    """Start exporting metrics as requested by the parsed command-line arguments.
+
+    Returns
+    -------
+    metrics : cipher_solver.metrics.SolverMetrics
+        The metrics to update, or None if no export is requested.
+    report : callable
+        The function to pass progress reports to, which prints them and writes the
+        metrics file, if any.
+    """
+
+    metrics = None
+
+    if args.metrics_port is not None or args.metrics_file is not None:
+        metrics = SolverMetrics()
+
+    if args.metrics_port is not None:
+        metrics.registry.serve(args.metrics_port)
+
+    def report(line):
+        print(line, file=sys.stderr)
+
+        if args.metrics_file is not None:
+            metrics.registry.write(args.metrics_file)
+
+    return metrics, report
+
+
+def batch(args):
+    """Run the batch subcommand with the passed command-line arguments."""
+
+    parser = argparse.ArgumentParser(
+        prog=f"{os.path.basename(sys.argv[0])} batch",
+        description="Solve all ciphertext files in a directory or matching a glob.",
+    )
+    parser.add_argument("input", help="directory or glob pattern of ciphertext files")
+    parser.add_argument(
+        "output",
+        help="output directory for plaintext files, or a .jsonl file for all results",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=None, help="number of worker processes"
+    )
+    parser.add_argument(
+        "--method", choices=("random", "deterministic"), default="random"
+    )
+    parser.add_argument(
+        "--restarts", type=int, default=1, help="maximum solver runs per file"
+    )
+    parser.add_argument(
+        "--verify",
+        action="store_true",
+        help="stop restarting once most of a plaintext is known words",
+    )
+    parser.add_argument(
+        "--triage",
+        action="store_true",
+        help="skip files that do not look like substitutions of English",
+    )
+    parser.add_argument(
+        "--seed-words",
+        action="store_true",
+        help="start from the letters implied by known words of each ciphertext",
+    )
+    parser.add_argument(
+        "--score-cache",
+        type=int,
+        default=0,
+        metavar="SIZE",
+        help="number of key scores to remember per file, so restarts rescore less",
+    )
+    add_metrics_arguments(parser)
+    args = parser.parse_args(args)
+
+    metrics, report = start_metrics(args)
+
+    run_batch(
+        args.input,
+        args.output,
+        method=args.method,
+        restarts=args.restarts,
+        verify=args.verify,
+        triage=args.triage,
+        seed_words=args.seed_words,
+        score_cache_size=args.score_cache,
+        workers=args.workers,
+        report=report,
+        metrics=metrics,
+    )
+
+
+def coordinate(args):
+    """Run the coordinate subcommand with the passed command-line arguments."""
+
+    parser = argparse.ArgumentParser(
+        prog=f"{os.path.basename(sys.argv[0])} coordinate",
+        description=(
+            "Queue all ciphertext files in a directory or matching a glob for workers "
+            "on any node sharing the queue directory, and merge their results."
+        ),
+    )
+    parser.add_argument("input", help="directory or glob pattern of ciphertext files")
+    parser.add_argument(
+        "output",
+        help="output directory for plaintext files, or a .jsonl file for all results",
+    )
+    parser.add_argument("queue", help="queue directory shared with the workers")
+    parser.add_argument(
+        "--method", choices=("random", "deterministic"), default="random"
+    )
+    parser.add_argument(
+        "--restarts", type=int, default=1, help="maximum solver runs per file"
+    )
+    parser.add_argument(
+        "--verify",
+        action="store_true",
+        help="stop restarting once most of a plaintext is known words",
+    )
+    parser.add_argument(
+        "--triage",
+        action="store_true",
+        help="skip files that do not look like substitutions of English",
+    )
+    parser.add_argument(
+        "--seed-words",
+        action="store_true",
+        help="start from the letters implied by known words of each ciphertext",
+    )
+    parser.add_argument(
+        "--score-cache",
+        type=int,
+        default=0,
+        metavar="SIZE",
+        help="number of key scores to remember per file, so restarts rescore less",
+    )
+    parser.add_argument(
+        "--stale-timeout",
+        type=float,
+        default=STALE_CLAIM_TIMEOUT,
+        help="seconds without a heartbeat before a file is given to another worker",
+    )
+    add_metrics_arguments(parser)
+    args = parser.parse_args(args)
+
+    metrics, report = start_metrics(args)
+
+    submit(
+        args.input,
+        args.queue,
+        args.output,
+        method=args.method,
+        restarts=args.restarts,
+        verify=args.verify,
+        triage=args.triage,
+        seed_words=args.seed_words,
+        score_cache_size=args.score_cache,
+    )
+    collect(
+        args.input,
+        args.queue,
+        args.output,
+        stale_timeout=args.stale_timeout,
+        report=report,
+        metrics=metrics,
+    )
+
+
+def work(args):
+    """Run the work subcommand with the passed command-line arguments."""
+
+    parser = argparse.ArgumentParser(
+        prog=f"{os.path.basename(sys.argv[0])} work",
+        description="Solve files from a shared queue until all of them are solved.",
+    )
+    parser.add_argument("queue", help="queue directory shared with the coordinator")
+    parser.add_argument(
+        "--workers", type=int, default=None, help="number of worker processes"
+    )
+    parser.add_argument(
+        "--stale-timeout",
+        type=float,
+        default=STALE_CLAIM_TIMEOUT,
+        help="seconds without a heartbeat before a file is given to another worker",
+    )
+    add_metrics_arguments(parser)
+    args = parser.parse_args(args)
+
+    metrics, report = start_metrics(args)
+
+    run_workers(
+        args.queue,
+        workers=args.workers,
+        stale_timeout=args.stale_timeout,
+        report=report,
+        metrics=metrics,
+    )
+
+
+# Subcommands by name.
+SUBCOMMANDS = {"batch": batch, "coordinate": coordinate, "work": work}
 
 
 def main():
     script_name = os.path.basename(sys.argv[0])
 
-    if len(sys.argv) != 2:
-        sys.exit(f"Incorrect arguments. Usage: {script_name} <path_to_ciphertext_file>")
+    if len(sys.argv) > 1 and sys.argv[1] in SUBCOMMANDS:
+        SUBCOMMANDS[sys.argv[1]](sys.argv[2:])
+        return
+
+    args = sys.argv[1:]
+
+    seed_words = "--seed-words" in args
+    if seed_words:
+        args.remove("--seed-words")
+
+    if len(args) != 1:
+        sys.exit(
+            f"Incorrect arguments. Usage: {script_name} <path_to_ciphertext_file> "
+            "[--seed-words]\n"
+            f"       {script_name} batch <input_directory_or_glob> <output>\n"
+            f"       {script_name} coordinate <input_directory_or_glob> <output> "
+            "<queue_directory>\n"
+            f"       {script_name} work <queue_directory>"
+        )
 
-    input_file = sys.argv[1]
+    input_file = args[0]
 
     with open(input_file) as f:
         ciphertext = f.read().strip()
 
-    s = SimpleSolver(ciphertext)
+    s = SimpleSolver(ciphertext, pattern_index=PatternIndex() if seed_words else None)
 
     print(f"\nCiphertext:\n{ciphertext}")
 
@@ -46,6 +46,69 @@ for letter, frequency in ENGLISH_LETTER_FREQUENCIES.items():
     index = ENGLISH_LETTERS_BY_FREQUENCY.index(letter)
     RANDOM_INDEX_DISTRIBUTION.extend([index] * int(10000 * frequency))
 
+# All digram frequencies are percentages with three decimals, so multiplying them by this
+# factor gives exact integers. Used by the "scaled_int" precision of the solver.
+DIGRAM_SCALE_FACTOR = 1000
+
+# Probability of drawing each index pair (a, b) with a != b, in either order, when
+# sampling two elements from RANDOM_INDEX_DISTRIBUTION. Indexed by [a][b] and symmetric.
+_index_counts = np.bincount(RANDOM_INDEX_DISTRIBUTION, minlength=STANDARD_ALPHABET_SIZE)
+_num_indices = len(RANDOM_INDEX_DISTRIBUTION)
+RANDOM_PAIR_PROBABILITIES = (
+    2 * np.outer(_index_counts, _index_counts) / (_num_indices * (_num_indices - 1))
+)
+np.fill_diagonal(RANDOM_PAIR_PROBABILITIES, 0)
+
+# All distinct swaps in a key as (low, high) index pairs, least likely to be drawn first.
+INDEX_PAIRS = sorted(
+    (
+        (a, b)
+        for a in range(STANDARD_ALPHABET_SIZE)
+        for b in range(a + 1, STANDARD_ALPHABET_SIZE)
+    ),
+    key=lambda pair: RANDOM_PAIR_PROBABILITIES[pair],
+)
+
+# All 3-cycles of key positions, i.e. moving the letters at (i, j, k) to (j, k, i) or to
+# (k, i, j), as arrays of the positions of each cycle and of the positions their new
+# letters come from. Ordered by the probability of drawing the positions from
+# RANDOM_INDEX_DISTRIBUTION, most likely first.
+_three_cycles = sorted(
+    (
+        ((i, j, k), sources)
+        for i in range(STANDARD_ALPHABET_SIZE)
+        for j in range(i + 1, STANDARD_ALPHABET_SIZE)
+        for k in range(j + 1, STANDARD_ALPHABET_SIZE)
+        for sources in ((j, k, i), (k, i, j))
+    ),
+    key=lambda cycle: -np.prod(_index_counts[list(cycle[0])], dtype=float),
+)
+THREE_CYCLE_POSITIONS = np.array([positions for positions, _ in _three_cycles])
+THREE_CYCLE_SOURCES = np.array([sources for _, sources in _three_cycles])
+
+# The number of random double swaps, i.e. two simultaneous swaps of four distinct
+# positions, to try when looking for a compound move out of a local minimum.
+NUM_DOUBLE_SWAP_SAMPLES = 2048
+
+# The number of compound moves scored together in one batch.
+MOVE_BATCH_SIZE = 1024
+
+# Total probability of drawing two distinct indices, i.e. an actual swap.
+DISTINCT_PAIR_PROBABILITY = RANDOM_PAIR_PROBABILITIES.sum() / 2
+
+# When the probability that a random swap is one not yet tried for the current key drops
+# below this value, the random solver stops drawing swaps and tries the remaining ones
+# in order instead, until the neighbourhood of the key is exhausted.
+UNTRIED_SWAP_PROBABILITY_THRESHOLD = 0.5
+
+# The random solver gives up after this many iterations without improvement, no matter
+# how much of the neighbourhood of the current key is left to try.
+MAX_ITERATIONS_WITHOUT_IMPROVEMENT = 2000
+
+# How quickly the confidence in a candidate key drops with its distance sum. A key with a
+# distance sum 1% worse than the best key is e times less likely than the best key.
+CONFIDENCE_SHARPNESS = 100
+
 # Source: http://norvig.com/mayzner.html
 # This is a (26 x 26) array containing the digram frequencies for the English language
 # and is used for scoring potential solutions. The rows and columns are sorted in order
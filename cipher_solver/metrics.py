@@ -0,0 +1,366 @@
+import math
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Upper bounds in seconds of the buckets of the solve latency histogram.
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Content type of the Prometheus text exposition format.
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_value(value):
+    """Format a sample value for the Prometheus text format."""
+
+    if value == math.inf:
+        return "+Inf"
+
+    return repr(value)
+
+
+class Metric:
+    """A named metric with a single value, see MetricsRegistry."""
+
+    type = "untyped"
+
+    def __init__(self, name, description, lock):
+        """Create new metric. Use the MetricsRegistry methods instead.
+
+        Parameters
+        ----------
+        name : str
+            The metric name.
+        description : str
+            A one-line description of the metric, exported as its help text.
+        lock : threading.Lock
+            The lock of the registry, held while updating or rendering metrics.
+        """
+
+        self.name = name
+        self.description = description
+        self.value = 0
+        self._lock = lock
+
+    def samples(self):
+        """Return the (name, value) samples of the metric."""
+
+        return [(self.name, self.value)]
+
+
+class Counter(Metric):
+    """A metric that only increases, e.g. the number of solved files."""
+
+    type = "counter"
+
+    def inc(self, amount=1):
+        """Increase the counter.
+
+        Parameters
+        ----------
+        amount : int
+            The amount to increase by, which must not be negative.
+
+        Raises
+        ------
+        ValueError
+            If the amount is negative.
+        """
+
+        if amount < 0:
+            raise ValueError("Counters can only increase.")
+
+        with self._lock:
+            self.value += amount
+
+
+class Gauge(Metric):
+    """A metric that can go up and down, e.g. the number of queued files."""
+
+    type = "gauge"
+
+    def set(self, value):
+        """Set the value of the gauge."""
+
+        with self._lock:
+            self.value = value
+
+
+class Histogram(Metric):
+    """A metric counting observations in buckets, e.g. solve latencies."""
+
+    type = "histogram"
+
+    def __init__(self, name, description, lock, buckets=LATENCY_BUCKETS):
+        """Create new histogram. Use MetricsRegistry.histogram() instead.
+
+        Parameters
+        ----------
+        name : str
+            The metric name.
+        description : str
+            A one-line description of the metric, exported as its help text.
+        lock : threading.Lock
+            The lock of the registry, held while updating or rendering metrics.
+        buckets : tuple
+            The increasing upper bounds of the buckets.
+        """
+
+        super().__init__(name, description, lock)
+        self.buckets = tuple(buckets) + (math.inf,)
+        self.bucket_counts = [0] * len(self.buckets)
+        self.sum = 0.0
+
+    def observe(self, value):
+        """Count an observed value in its bucket."""
+
+        with self._lock:
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self.bucket_counts[i] += 1
+                    break
+
+            self.value += 1
+            self.sum += value
+
+    def samples(self):
+        """Return the cumulative bucket, sum and count samples of the histogram."""
+
+        samples = []
+        cumulative_count = 0
+
+        for bound, count in zip(self.buckets, self.bucket_counts):
+            cumulative_count += count
+            label = f'{{le="{_format_value(float(bound))}"}}'
+            samples.append((f"{self.name}_bucket{label}", cumulative_count))
+
+        samples.append((f"{self.name}_sum", self.sum))
+        samples.append((f"{self.name}_count", self.value))
+
+        return samples
+
+
+class MetricsRegistry:
+    """A set of metrics that can be exported in the Prometheus text format.
+
+    Metrics can be updated from one thread while being exported from another, e.g. by
+    the HTTP server started with .serve().
+    """
+
+    def __init__(self):
+        """Create new, empty registry."""
+
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _add(self, metric_class, name, description, **kwargs):
+        """Return the metric with a name, creating it if needed."""
+
+        metric = self._metrics.get(name)
+
+        if metric is None:
+            metric = metric_class(name, description, self._lock, **kwargs)
+            self._metrics[name] = metric
+        elif not isinstance(metric, metric_class):
+            raise ValueError(f"Metric {name} is already a {metric.type}.")
+
+        return metric
+
+    def counter(self, name, description):
+        """Return the counter with a name, creating it if needed.
+
+        Raises
+        ------
+        ValueError
+            If another type of metric has the same name.
+        """
+
+        return self._add(Counter, name, description)
+
+    def gauge(self, name, description):
+        """Return the gauge with a name, creating it if needed.
+
+        Raises
+        ------
+        ValueError
+            If another type of metric has the same name.
+        """
+
+        return self._add(Gauge, name, description)
+
+    def histogram(self, name, description, buckets=LATENCY_BUCKETS):
+        """Return the histogram with a name, creating it if needed.
+
+        Raises
+        ------
+        ValueError
+            If another type of metric has the same name.
+        """
+
+        return self._add(Histogram, name, description, buckets=buckets)
+
+    def render(self):
+        """Return all metrics in the Prometheus text exposition format."""
+
+        lines = []
+
+        with self._lock:
+            for metric in self._metrics.values():
+                lines.append(f"# HELP {metric.name} {metric.description}")
+                lines.append(f"# TYPE {metric.name} {metric.type}")
+                lines.extend(
+                    f"{name} {_format_value(value)}" for name, value in metric.samples()
+                )
+
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """Write all metrics to a file, e.g. for the node exporter textfile collector.
+
+        The file is replaced atomically, so readers never see a partial file.
+
+        Parameters
+        ----------
+        path : str
+            The file to write, conventionally ending in ".prom".
+        """
+
+        temporary_path = f"{path}.{os.getpid()}.tmp"
+
+        with open(temporary_path, "w") as f:
+            f.write(self.render())
+
+        os.replace(temporary_path, path)
+
+    def serve(self, port, host="127.0.0.1"):
+        """Serve the metrics over HTTP from a background thread.
+
+        Parameters
+        ----------
+        port : int
+            The port to listen on, or zero for any free port.
+        host : str
+            The address to listen on. Defaults to local connections only.
+
+        Returns
+        -------
+        server : http.server.ThreadingHTTPServer
+            The running server. Its server_address holds the actual port, and
+            .shutdown() stops it.
+        """
+
+        registry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):  # noqa: N802
+                body = registry.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                # Scrapes are frequent, so don't log each of them.
+                pass
+
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        return server
+
+
+class SolverMetrics:
+    """The standard metrics of solving files, updated from each file's result.
+
+    The solver counts its work in local variables while solving, see
+    SimpleSolver.statistics(), so the metrics are updated once per solved file rather
+    than from inside the solve loops.
+    """
+
+    # Solver statistics exported as counters, with their descriptions.
+    STATISTICS = {
+        "iterations": "Solver loop iterations.",
+        "swaps_evaluated": "Key swaps scored.",
+        "swaps_accepted": "Key swaps that improved the score.",
+        "moves_evaluated": "Compound key moves scored.",
+        "moves_accepted": "Compound key moves that improved the score.",
+        "cache_hits": "Key scores found in the score cache.",
+        "cache_misses": "Key scores not found in the score cache.",
+    }
+
+    def __init__(self, registry=None):
+        """Create the metrics in a registry.
+
+        Parameters
+        ----------
+        registry : MetricsRegistry
+            The registry to add the metrics to. Defaults to a new registry.
+        """
+
+        if registry is None:
+            registry = MetricsRegistry()
+
+        self.registry = registry
+
+        self._solves = registry.counter(
+            "cipher_solver_solves_total", "Files solved, including failed ones."
+        )
+        self._errors = registry.counter(
+            "cipher_solver_solve_errors_total", "Files that could not be solved."
+        )
+        self._skipped = registry.counter(
+            "cipher_solver_skipped_total", "Files skipped by triage as hopeless."
+        )
+        self._latency = registry.histogram(
+            "cipher_solver_solve_seconds", "Time to solve a file in seconds."
+        )
+        self._statistics = {
+            name: registry.counter(f"cipher_solver_{name}_total", description)
+            for name, description in self.STATISTICS.items()
+        }
+        self._accept_rate = registry.gauge(
+            "cipher_solver_swap_accept_rate", "Fraction of scored key swaps accepted."
+        )
+        self._cache_hit_rate = registry.gauge(
+            "cipher_solver_cache_hit_rate", "Fraction of key scores found in the cache."
+        )
+        self._queue_depth = registry.gauge(
+            "cipher_solver_queue_depth", "Files waiting to be solved."
+        )
+
+    def record(self, result):
+        """Update the metrics with the result of solving a file.
+
+        Parameters
+        ----------
+        result : dict
+            A result from cipher_solver.batch.solve_file().
+        """
+
+        self._solves.inc()
+        self._latency.observe(result["seconds"])
+
+        if "error" in result:
+            self._errors.inc()
+
+        if "skipped" in result:
+            self._skipped.inc()
+
+        for name, count in result.get("statistics", {}).items():
+            if name in self._statistics:
+                self._statistics[name].inc(count)
+
+        evaluated = self._statistics["swaps_evaluated"].value
+        if evaluated:
+            self._accept_rate.set(self._statistics["swaps_accepted"].value / evaluated)
+
+        hits = self._statistics["cache_hits"].value
+        lookups = hits + self._statistics["cache_misses"].value
+        if lookups:
+            self._cache_hit_rate.set(hits / lookups)
+
+    def set_queue_depth(self, depth):
+        """Set the number of files waiting to be solved."""
+
+        self._queue_depth.set(depth)
@@ -0,0 +1,197 @@
+import re
+from collections import defaultdict
+from string import ascii_lowercase
+
+import numpy as np
+
+from cipher_solver.consts import STANDARD_ALPHABET_SIZE
+from cipher_solver.verify import load_words
+
+# Fewest different ciphertext words that must agree on the plaintext letter of a
+# ciphertext letter for it to be accepted, since any single word may be one that is
+# not in the index but has the pattern of one that is.
+MIN_AGREEING_WORDS = 2
+
+# How many times more words must agree on the plaintext letter of a ciphertext letter
+# than on any contradicting letter, i.e. another plaintext letter for the same
+# ciphertext letter or the same plaintext letter for another ciphertext letter.
+MIN_VOTE_RATIO = 2
+
+
+def word_pattern(word):
+    """Return the letter pattern of a word.
+
+    Each letter is replaced by the letter of the alphabet at the position of its first
+    occurrence among the distinct letters of the word, e.g. "letter" gives "abccbd".
+    A substitution keeps the pattern of every word, so the plaintext of a ciphertext
+    word is one of the words with the same pattern.
+
+    Parameters
+    ----------
+    word : str
+        A lowercase word.
+
+    Returns
+    -------
+    pattern : str
+        The pattern of the word.
+    """
+
+    first_occurrences = {}
+
+    return "".join(
+        ascii_lowercase[first_occurrences.setdefault(c, len(first_occurrences))]
+        for c in word
+    )
+
+
+class PatternIndex:
+    """Index of known words by their letter pattern, used to seed decryption keys.
+
+    The words of each pattern are kept as rows of a single array of letter indices,
+    so all words of a pattern are checked against the possible letters at once. The
+    index is built lazily on first use, so creating one is cheap.
+    """
+
+    def __init__(self, words=None):
+        """Create new index.
+
+        Parameters
+        ----------
+        words : iterable
+            The known words. Defaults to the English word list in
+            cipher_solver.verify.DEFAULT_WORD_LIST.
+        """
+
+        self._source_words = words
+        self._words_by_pattern = None
+
+    def _build_index(self):
+        """Group the words by pattern, unless already done."""
+
+        if self._words_by_pattern is not None:
+            return
+
+        words = self._source_words
+        if words is None:
+            words = load_words()
+
+        words_by_pattern = defaultdict(set)
+        for word in words:
+            word = word.lower()
+            if word and all(c in ascii_lowercase for c in word):
+                words_by_pattern[word_pattern(word)].add(word)
+
+        self._words_by_pattern = {
+            pattern: np.array(
+                [[ascii_lowercase.index(c) for c in word] for word in sorted(words)],
+                dtype=np.uint8,
+            )
+            for pattern, words in words_by_pattern.items()
+        }
+
+    def words(self, pattern):
+        """Return the known words with a letter pattern.
+
+        Parameters
+        ----------
+        pattern : str
+            A letter pattern, see word_pattern().
+
+        Returns
+        -------
+        words : list
+            The words with the pattern, in alphabetical order.
+        """
+
+        self._build_index()
+
+        rows = self._words_by_pattern.get(pattern, ())
+
+        return ["".join(ascii_lowercase[i] for i in row) for row in rows]
+
+    def seed_letters(self, ciphertext):
+        """Find ciphertext letters whose plaintext letter the words agree on.
+
+        Each ciphertext word with known words of its pattern that are still possible
+        votes for the plaintext letters that all of those known words have at the
+        same positions. A letter is accepted once at least MIN_AGREEING_WORDS
+        different words vote for it, and more than MIN_VOTE_RATIO times as many as
+        for any contradicting letter. The accepted letters then rule out known words
+        for the other letters, and votes are counted again until no more letters
+        are accepted.
+
+        No single word decides a letter, since any ciphertext word may be one that
+        is not in the index, which still fits the pattern of known words.
+
+        Only the words of ciphertexts that keep their word boundaries can be used,
+        and the more different words they have, the more letters are found.
+
+        Parameters
+        ----------
+        ciphertext : str
+            The ciphertext to find letters for.
+
+        Returns
+        -------
+        letters : dict
+            Maps ciphertext letters to the plaintext letters the words agree on.
+        """
+
+        self._build_index()
+
+        # The distinct ciphertext words with known words of their pattern, as arrays
+        # of letter indices, and those known words.
+        cipher_words = []
+        candidates = []
+
+        for word in set(re.findall("[a-z]+", ciphertext.lower())):
+            words = self._words_by_pattern.get(word_pattern(word))
+
+            if words is not None:
+                cipher_words.append(np.array([ascii_lowercase.index(c) for c in word]))
+                candidates.append(words)
+
+        # possible[c, p] is whether ciphertext letter c can decrypt to plaintext
+        # letter p.
+        possible = np.ones((STANDARD_ALPHABET_SIZE,) * 2, dtype=bool)
+        is_known = np.zeros(STANDARD_ALPHABET_SIZE, dtype=bool)
+
+        while True:
+            votes = np.zeros((STANDARD_ALPHABET_SIZE,) * 2, dtype=np.int64)
+
+            for cipher_word, words in zip(cipher_words, candidates):
+                words = words[possible[cipher_word, words].all(axis=1)]
+
+                if not len(words):
+                    continue
+
+                # Count each letter of the word once, even if it repeats.
+                is_agreed = (words == words[0]).all(axis=0) & ~is_known[cipher_word]
+                letters = set(zip(cipher_word[is_agreed], words[0][is_agreed]))
+                for c, p in letters:
+                    votes[c, p] += 1
+
+            accepted = []
+
+            for c, p in zip(*np.nonzero(votes >= MIN_AGREEING_WORDS)):
+                conflicting_votes = max(
+                    np.delete(votes[c], p).max(), np.delete(votes[:, p], c).max()
+                )
+
+                if votes[c, p] > MIN_VOTE_RATIO * conflicting_votes:
+                    accepted.append((c, p))
+
+            if not accepted:
+                break
+
+            for c, p in accepted:
+                possible[c] = False
+                possible[:, p] = False
+                possible[c, p] = True
+                is_known[c] = True
+
+        return {
+            ascii_lowercase[c]: ascii_lowercase[possible[c].argmax()]
+            for c in np.flatnonzero(is_known)
+        }
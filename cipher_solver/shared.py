@@ -0,0 +1,245 @@
+import atexit
+import os
+import sys
+from collections.abc import Mapping
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from cipher_solver.consts import (
+    DIGRAM_MATRIX_ENGLISH,
+    ENGLISH_LETTERS_BY_FREQUENCY,
+    RANDOM_INDEX_DISTRIBUTION,
+    STANDARD_ALPHABET_SIZE,
+)
+
+# Byte alignment of each table within the shared memory block.
+TABLE_ALIGNMENT = 64
+
+
+def english_tables():
+    """Return the tables of the English language model used by SimpleSolver.
+
+    Returns
+    -------
+    tables : dict
+        The "digram_matrix" and "random_index_distribution" as numpy arrays.
+    """
+
+    return {
+        "digram_matrix": DIGRAM_MATRIX_ENGLISH,
+        "random_index_distribution": np.array(
+            RANDOM_INDEX_DISTRIBUTION, dtype=np.int64
+        ),
+    }
+
+
+def language_tables(text):
+    """Return the tables of a language model computed from a sample text.
+
+    Only the letters a to z are counted, ignoring case, so text in languages with
+    other letters should be transliterated first. The tables have the same layout as
+    english_tables(), with letters at their positions in ENGLISH_LETTERS_BY_FREQUENCY,
+    so that each key position decrypts to the same letter whatever the language.
+
+    Parameters
+    ----------
+    text : str
+        A sample text of the language, preferably tens of thousands of letters.
+
+    Returns
+    -------
+    tables : dict
+        The "digram_matrix", in percent of all digrams, and the
+        "random_index_distribution", with each position repeated in proportion to the
+        frequency of its letter, like RANDOM_INDEX_DISTRIBUTION.
+
+    Raises
+    ------
+    ValueError
+        If the text does not contain at least one digram.
+    """
+
+    # Positions in ENGLISH_LETTERS_BY_FREQUENCY by character code, with non-letters
+    # at an extra position past the end.
+    positions = np.full(256, STANDARD_ALPHABET_SIZE, dtype=np.int64)
+    for i, letter in enumerate(ENGLISH_LETTERS_BY_FREQUENCY):
+        positions[ord(letter)] = i
+
+    codes = np.frombuffer(text.lower().encode("ascii", "replace"), dtype=np.uint8)
+    letters = positions[codes]
+
+    is_digram = (letters[:-1] < STANDARD_ALPHABET_SIZE) & (
+        letters[1:] < STANDARD_ALPHABET_SIZE
+    )
+    if not is_digram.any():
+        raise ValueError("Text must contain at least one digram.")
+
+    digrams = letters[:-1][is_digram] * STANDARD_ALPHABET_SIZE + letters[1:][is_digram]
+    digram_counts = np.bincount(digrams, minlength=STANDARD_ALPHABET_SIZE**2)
+    digram_matrix = 100 * digram_counts.reshape((STANDARD_ALPHABET_SIZE,) * 2)
+    digram_matrix = digram_matrix / digram_counts.sum()
+
+    letter_counts = np.bincount(letters, minlength=STANDARD_ALPHABET_SIZE + 1)
+    letter_frequencies = letter_counts[:-1] / letter_counts[:-1].sum()
+
+    return {
+        "digram_matrix": digram_matrix,
+        "random_index_distribution": np.repeat(
+            np.arange(STANDARD_ALPHABET_SIZE),
+            (10000 * letter_frequencies).astype(np.int64),
+        ),
+    }
+
+
+class SharedModel(Mapping):
+    """Language model tables in shared memory, readable by many processes.
+
+    The tables are published once by a parent process, which copies them into a single
+    shared memory block, and attached to by other processes as read-only numpy arrays
+    backed directly by that block, without copying. A SharedModel can be passed to
+    other processes, e.g. as an argument to a multiprocessing pool, and is attached to
+    when unpickled. It works as a mapping from table names to arrays, so it can be
+    passed as the model of a SimpleSolver.
+
+    The publishing process owns the block and removes it when closing the model, which
+    also happens automatically when the process exits.
+    """
+
+    def __init__(self, shm, layout, is_owner):
+        """Create new shared model from a shared memory block.
+
+        Use .publish() or .attach() rather than creating instances directly.
+
+        Parameters
+        ----------
+        shm : multiprocessing.shared_memory.SharedMemory
+            The shared memory block holding the tables.
+        layout : dict
+            Maps each table name to its (offset, shape, dtype) within the block.
+        is_owner : bool
+            Whether this process created the block and should remove it.
+        """
+
+        self._shm = shm
+        self._layout = layout
+        self._owner_pid = os.getpid() if is_owner else None
+
+        self._tables = {}
+        for name, (offset, shape, dtype) in layout.items():
+            table = np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset)
+            table.flags.writeable = False
+            self._tables[name] = table
+
+    @classmethod
+    def publish(cls, tables=None):
+        """Copy tables into a new shared memory block.
+
+        Parameters
+        ----------
+        tables : dict
+            Maps table names to numpy arrays. Defaults to english_tables().
+
+        Returns
+        -------
+        shared_model : SharedModel
+            The published model, owned by the calling process.
+        """
+
+        if tables is None:
+            tables = english_tables()
+
+        layout = {}
+        size = 0
+
+        for name, table in tables.items():
+            table = np.asarray(table)
+            offset = -(-size // TABLE_ALIGNMENT) * TABLE_ALIGNMENT
+            layout[name] = (offset, table.shape, table.dtype.str)
+            size = offset + table.nbytes
+
+        shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+
+        for name, table in tables.items():
+            offset, shape, dtype = layout[name]
+            target = np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset)
+            target[...] = table
+            del target
+
+        shared_model = cls(shm, layout, is_owner=True)
+        atexit.register(shared_model.close)
+
+        return shared_model
+
+    @classmethod
+    def attach(cls, name, layout):
+        """Attach to tables published by another process.
+
+        Parameters
+        ----------
+        name : str
+            The name of the shared memory block.
+        layout : dict
+            Maps each table name to its (offset, shape, dtype) within the block.
+
+        Returns
+        -------
+        shared_model : SharedModel
+            The attached, read-only model.
+
+        Raises
+        ------
+        FileNotFoundError
+            If the shared memory block no longer exists.
+        """
+
+        # Only the publishing process should track the block for clean-up, otherwise
+        # the block could be removed when an attached process exits.
+        if sys.version_info >= (3, 13):
+            shm = shared_memory.SharedMemory(name=name, track=False)
+        else:
+            shm = shared_memory.SharedMemory(name=name)
+
+        return cls(shm, layout, is_owner=False)
+
+    def __reduce__(self):
+        return (self.attach, (self._shm.name, self._layout))
+
+    def __getitem__(self, name):
+        return self._tables[name]
+
+    def __iter__(self):
+        return iter(self._tables)
+
+    def __len__(self):
+        return len(self._tables)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Detach from the tables, and remove them if published by this process.
+
+        The tables can no longer be used through this model after closing it. Arrays
+        taken from it earlier keep the memory mapped until they are garbage collected.
+        """
+
+        if self._shm is None:
+            return
+
+        self._tables = {}
+
+        try:
+            self._shm.close()
+        except BufferError:
+            # Arrays backed by the block are still referenced elsewhere. The mapping
+            # is released when they are, or when the process exits.
+            pass
+
+        if self._owner_pid == os.getpid():
+            self._shm.unlink()
+
+        self._shm = None
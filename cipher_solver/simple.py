@@ -1,17 +1,60 @@
+import heapq
+import math
+import os
 import random
-from collections import Counter
-from string import ascii_lowercase, ascii_uppercase
+from collections import Counter, OrderedDict
+from string import ascii_lowercase
 
 import numpy as np
 
 from cipher_solver.consts import (
+    CONFIDENCE_SHARPNESS,
     DIGRAM_MATRIX_ENGLISH,
+    DIGRAM_SCALE_FACTOR,
+    DISTINCT_PAIR_PROBABILITY,
     ENGLISH_LETTERS_BY_FREQUENCY,
+    INDEX_PAIRS,
+    MAX_ITERATIONS_WITHOUT_IMPROVEMENT,
+    MOVE_BATCH_SIZE,
+    NUM_DOUBLE_SWAP_SAMPLES,
     RANDOM_INDEX_DISTRIBUTION,
+    RANDOM_PAIR_PROBABILITIES,
     STANDARD_ALPHABET_SIZE,
+    THREE_CYCLE_POSITIONS,
+    THREE_CYCLE_SOURCES,
+    UNTRIED_SWAP_PROBABILITY_THRESHOLD,
 )
 from cipher_solver.utils import common_to_alphabetical_key
 
+# Random 64-bit numbers for each letter at each key position. The hash of a key is the
+# XOR of the numbers of its letters, which can be updated for a swap in constant time.
+_hash_random = random.Random(0)  # nosec:B311
+KEY_POSITION_HASHES = [
+    {letter: _hash_random.getrandbits(64) for letter in ascii_lowercase}
+    for _ in range(STANDARD_ALPHABET_SIZE)
+]
+
+# Number of characters decrypted at a time when streaming plaintext.
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+# The numeric representations the digram matrices can be kept in while solving.
+PRECISIONS = ("float64", "float32", "scaled_int")
+
+# The compound moves the solvers can try to escape a local minimum of single swaps.
+COMPOUND_MOVES = ("3-cycle", "double-swap")
+
+# Number of random solver iterations between checks for cancellation, each of which
+# also reports progress.
+PROGRESS_INTERVAL = 256
+
+# Number of passes over all swaps made for every language model at once when
+# identifying the language of a ciphertext, before committing to the best fitting one.
+LANGUAGE_IDENTIFICATION_PASSES = 2
+
+
+class SolveCancelled(Exception):
+    """Raised by SimpleSolver.solve() when its cancellation token is set."""
+
 
 class SimpleSolver:
     """Solver for simple monoalphabetic substitution ciphers.
@@ -35,21 +78,61 @@ class SimpleSolver:
     "distance sum" : The method used to score solutions, see ._score() for details.
     """
 
-    def __init__(self, ciphertext):
+    def __init__(
+        self,
+        ciphertext,
+        precision="float64",
+        model=None,
+        score_cache_size=0,
+        partial_key=None,
+        cribs=None,
+        pattern_index=None,
+    ):
         """Create new solver.
 
         Creates a new cipher solver from an initial ciphertext.
 
+        The letters known from the partial key and the cribs are pinned: the initial
+        key has them in place and no solve method ever moves them, so only the
+        unpinned letters are searched. Letters seeded from the pattern index are only
+        placed in the initial key, and are moved like any other if that improves it.
+
         Parameters
         ----------
         ciphertext : str
             The ciphertext to solve.
+        precision : str
+            The numeric representation of digram matrices while solving, one of
+            "float64", "float32" or "scaled_int". The latter stores percentages
+            multiplied by DIGRAM_SCALE_FACTOR as integers.
+        model : mapping
+            Optional language model tables to use instead of the English constants,
+            with a "digram_matrix" and a "random_index_distribution", e.g. a
+            cipher_solver.shared.SharedModel. With the default float64 precision, the
+            tables are used as they are, without copying them.
+        score_cache_size : int
+            The number of key scores to remember in the random solver, so that keys
+            seen before, e.g. in earlier restarts, are not scored again. Zero
+            disables the cache.
+        partial_key : str
+            Optional known part of the alphabetical decryption key, with "." for
+            unknown letters, e.g. "....x" followed by 21 dots if the ciphertext letter
+            "x" is known to decrypt to "e".
+        cribs : iterable
+            Optional (plaintext, position) pairs of known plaintext, each found at
+            a character position of the ciphertext, e.g. [("dear sir", 0)].
+        pattern_index : cipher_solver.patterns.PatternIndex
+            Optional index of known words by letter pattern, used to start from the
+            letters that the words of the ciphertext imply, see
+            PatternIndex.seed_letters(), rather than from letter frequencies alone.
 
         Raises
         ------
         ValueError
             If the passed ciphertext is not a string.
             If the passed ciphertext is empty.
+            If the passed precision is unknown.
+            If the partial key or the cribs are invalid or contradict each other.
         """
 
         if not isinstance(ciphertext, str):
@@ -58,6 +141,29 @@ class SimpleSolver:
         if len(ciphertext) < 1:
             raise ValueError("Ciphertext cannot be empty.")
 
+        if precision not in PRECISIONS:
+            raise ValueError(f"Unknown precision {precision}")
+
+        # Known ciphertext letters by the key position they are pinned to.
+        self._pins = self._get_pins(ciphertext, partial_key, cribs)
+
+        self._precision = precision
+
+        # Least recently used cache of scores by key hash, see .get_key_hash().
+        self._score_cache_size = score_cache_size
+        self._score_cache = OrderedDict()
+
+        if model is None:
+            model = {
+                "digram_matrix": DIGRAM_MATRIX_ENGLISH,
+                "random_index_distribution": RANDOM_INDEX_DISTRIBUTION,
+            }
+
+        self._set_model(model)
+
+        # Ciphertext letters by the key position the words of the ciphertext imply.
+        self._seeds = self._get_seeds(ciphertext, pattern_index)
+
         # The decryption key is a list of letters that determines how the ciphertext is
         # converted to plaintext. The key is equal in length to the English alphabet and
         # is assumed to be in frequency order. In other words, the first letter is the
@@ -67,18 +173,105 @@ class SimpleSolver:
 
         self._ciphertext = ciphertext
 
-    def _get_initial_key(self, ciphertext):
+        # Bounded heap of the best distinct keys scored during the last solve, as
+        # (-score, -sequence_number, key) tuples so the worst candidate is at the top,
+        # with later keys considered worse on equal scores, and the set of keys in it.
+        self._num_candidates = 1
+        self._candidates = []
+        self._candidate_keys = set()
+        self._num_scored_candidates = 0
+
+        # Compound move types tried when single swaps no longer improve the score.
+        self._compound_moves = ()
+
+        # Counts of the work done by the last solve, see .statistics().
+        self._statistics = Counter()
+
+        # The cancellation token and progress callback of the current solve.
+        self._cancel_token = None
+        self._progress = None
+
+    def _set_model(self, model):
+        """Use a language model for solving from now on.
+
+        Parameters
+        ----------
+        model : mapping
+            The language model tables, see SimpleSolver.
+        """
+
+        # The digram matrix of the language converted to the precision used while
+        # solving, and the distribution random swap indices are drawn from.
+        self._model_matrix = self._to_precision(model["digram_matrix"])
+        self._random_index_distribution = model["random_index_distribution"]
+
+        # The key positions from the most to the least common letter of the language,
+        # which for English is the order of the positions themselves.
+        self._position_order = self._get_position_order(model)
+
+        # The swaps and compound moves that only involve unpinned key positions, and
+        # the probabilities of drawing each swap, see RANDOM_PAIR_PROBABILITIES. The
+        # English tables are precomputed.
+        if (
+            self._random_index_distribution is RANDOM_INDEX_DISTRIBUTION
+            and not self._pins
+        ):
+            self._index_pairs = INDEX_PAIRS
+            self._pair_probabilities = RANDOM_PAIR_PROBABILITIES
+            self._distinct_pair_probability = DISTINCT_PAIR_PROBABILITY
+            self._three_cycle_positions = THREE_CYCLE_POSITIONS
+            self._three_cycle_sources = THREE_CYCLE_SOURCES
+        else:
+            self._set_swap_tables()
+
+        # Scores cached under another model no longer apply.
+        self._score_cache.clear()
+
+    def _get_position_order(self, model):
+        """Order the key positions by the letter frequencies of a language model.
+
+        Parameters
+        ----------
+        model : mapping
+            The language model tables, see SimpleSolver.
+
+        Returns
+        -------
+        position_order : list
+            The key positions, most common plaintext letter in the language first.
+        """
+
+        distribution = model["random_index_distribution"]
+
+        # The positions are in English frequency order by definition, so skip
+        # counting the letters of the English distribution for every new solver.
+        if distribution is RANDOM_INDEX_DISTRIBUTION:
+            return list(range(STANDARD_ALPHABET_SIZE))
+
+        counts = np.bincount(distribution, minlength=STANDARD_ALPHABET_SIZE)
+
+        return [int(i) for i in np.argsort(-counts, kind="stable")]
+
+    def _get_initial_key(self, ciphertext, position_order=None, seeds=None):
         """Construct the initial decryption key.
 
         The initial decryption key is based on the letter frequencies in the ciphertext,
         meaning an assumption that the most common letter in the ciphertext translates
         to the most common letter in the English language, and so on. Any letters not
         present in the ciphertext will be added alphabetically at the end of the key.
+        Pinned and seeded letters are put at their known positions first.
 
         Parameters
         ----------
         ciphertext : str
             The ciphertext to generate an initial decryption key from.
+        position_order : list
+            The key positions from the most to the least common letter of the
+            language, see ._get_position_order(). Defaults to the order of the
+            language model in use, which for English is the positions in order.
+        seeds : dict
+            The seeded ciphertext letters by key position, see ._get_seeds().
+            Defaults to the seeds of the solver.
 
         Returns
         -------
@@ -104,8 +297,202 @@ class SimpleSolver:
             if c not in decryption_key:
                 decryption_key += c
 
+        if position_order is None:
+            position_order = self._position_order
+
+        if seeds is None:
+            seeds = self._seeds
+
+        # Seeds never share positions or letters with pins.
+        placed = {**seeds, **self._pins}
+
+        # Fill the other positions with the other letters, both in frequency order.
+        other_letters = iter(c for c in decryption_key if c not in placed.values())
+        other_positions = [i for i in position_order if i not in placed]
+
+        decryption_key = [None] * STANDARD_ALPHABET_SIZE
+        for i, letter in placed.items():
+            decryption_key[i] = letter
+        for i, letter in zip(other_positions, other_letters):
+            decryption_key[i] = letter
+
         return decryption_key
 
+    def _get_pins(self, ciphertext, partial_key, cribs):
+        """Find the key letters that are known from a partial key and cribs.
+
+        Parameters
+        ----------
+        ciphertext : str
+            The ciphertext the cribs are positioned in.
+        partial_key : str
+            Known part of the alphabetical decryption key, with "." for unknown
+            letters, or None.
+        cribs : iterable
+            (plaintext, position) pairs of known plaintext, or None.
+
+        Returns
+        -------
+        pins : dict
+            Maps common key positions to their known ciphertext letters.
+
+        Raises
+        ------
+        ValueError
+            If the partial key does not have one letter or "." per letter of the
+            alphabet.
+            If a crib is outside the ciphertext, or its letters don't line up with
+            ciphertext letters.
+            If a plaintext letter is pinned to two ciphertext letters, or the other
+            way around.
+        """
+
+        # Known plaintext letters by the ciphertext letter they decrypt from.
+        known_letters = {}
+
+        def add(cipher_letter, plain_letter):
+            if known_letters.setdefault(cipher_letter, plain_letter) != plain_letter:
+                raise ValueError(
+                    f"Ciphertext letter {cipher_letter} is pinned to both "
+                    f"{known_letters[cipher_letter]} and {plain_letter}."
+                )
+
+        if partial_key is not None:
+            partial_key = partial_key.lower()
+
+            if len(partial_key) != STANDARD_ALPHABET_SIZE or any(
+                c != "." and c not in ascii_lowercase for c in partial_key
+            ):
+                raise ValueError(
+                    f"Partial key must have {STANDARD_ALPHABET_SIZE} letters or dots."
+                )
+
+            for plain_letter, cipher_letter in zip(ascii_lowercase, partial_key):
+                if cipher_letter != ".":
+                    add(cipher_letter, plain_letter)
+
+        for plaintext, position in cribs or ():
+            end = position + len(plaintext)
+
+            if position < 0 or end > len(ciphertext):
+                raise ValueError(f"Crib {plaintext} is outside the ciphertext.")
+
+            aligned_text = ciphertext[position:end]
+
+            for plain_letter, cipher_letter in zip(plaintext.lower(), aligned_text):
+                cipher_letter = cipher_letter.lower()
+                is_plain_letter = plain_letter in ascii_lowercase
+
+                if is_plain_letter != (cipher_letter in ascii_lowercase):
+                    raise ValueError(
+                        f"Crib {plaintext} does not line up with the ciphertext."
+                    )
+
+                if is_plain_letter:
+                    add(cipher_letter, plain_letter)
+
+        pins = {}
+
+        for cipher_letter, plain_letter in known_letters.items():
+            position = ENGLISH_LETTERS_BY_FREQUENCY.index(plain_letter)
+
+            if pins.setdefault(position, cipher_letter) != cipher_letter:
+                raise ValueError(
+                    f"Plaintext letter {plain_letter} is pinned to both "
+                    f"{pins[position]} and {cipher_letter}."
+                )
+
+        return pins
+
+    def _get_seeds(self, ciphertext, pattern_index):
+        """Find the key letters implied by the words of the ciphertext.
+
+        Parameters
+        ----------
+        ciphertext : str
+            The ciphertext to find letters for.
+        pattern_index : cipher_solver.patterns.PatternIndex
+            The index of known words to find letters with, or None.
+
+        Returns
+        -------
+        seeds : dict
+            Maps common key positions to ciphertext letters, leaving out pinned
+            positions and letters. Empty unless the seeded initial key has a lower
+            distance sum to the language model than the one from letter frequencies.
+        """
+
+        if pattern_index is None:
+            return {}
+
+        seeds = {}
+        placed_letters = set(self._pins.values())
+
+        for cipher_letter, plain_letter in pattern_index.seed_letters(
+            ciphertext
+        ).items():
+            position = ENGLISH_LETTERS_BY_FREQUENCY.index(plain_letter)
+
+            if position not in self._pins and cipher_letter not in placed_letters:
+                seeds[position] = cipher_letter
+                placed_letters.add(cipher_letter)
+
+        def distance_sum(key):
+            plaintext = ciphertext.translate(self._get_translation_table(key))
+            return self._score(
+                self._to_precision(self._get_digram_matrix(plaintext)),
+                self._model_matrix,
+            )
+
+        # The words may still imply wrong letters, so only keep the seeds if they
+        # bring the initial key closer to the language than letter frequencies do.
+        if seeds and distance_sum(
+            self._get_initial_key(ciphertext, seeds=seeds)
+        ) >= distance_sum(self._get_initial_key(ciphertext, seeds={})):
+            return {}
+
+        return seeds
+
+    def _set_swap_tables(self):
+        """Derive the swaps and compound moves from the language model in use.
+
+        The random index distribution is filtered to the unpinned positions, and the
+        swap probabilities are computed for it, like RANDOM_PAIR_PROBABILITIES. The
+        swaps between unpinned positions and the 3-cycles among them are ordered by
+        the same distribution, like INDEX_PAIRS and THREE_CYCLE_POSITIONS.
+        """
+
+        pinned = list(self._pins)
+
+        distribution = self._random_index_distribution
+        if pinned:
+            distribution = [int(i) for i in distribution if i not in self._pins]
+            self._random_index_distribution = distribution
+
+        counts = np.bincount(distribution, minlength=STANDARD_ALPHABET_SIZE)
+        num_indices = len(distribution)
+        self._pair_probabilities = np.zeros((STANDARD_ALPHABET_SIZE,) * 2)
+        if num_indices > 1:
+            self._pair_probabilities = (
+                2 * np.outer(counts, counts) / (num_indices * (num_indices - 1))
+            )
+            np.fill_diagonal(self._pair_probabilities, 0)
+        self._distinct_pair_probability = self._pair_probabilities.sum() / 2
+
+        unpinned = [i for i in range(STANDARD_ALPHABET_SIZE) if i not in self._pins]
+        self._index_pairs = sorted(
+            ((a, b) for a in unpinned for b in unpinned if a < b),
+            key=lambda pair: self._pair_probabilities[pair],
+        )
+
+        is_unpinned = ~np.isin(THREE_CYCLE_POSITIONS, pinned).any(axis=1)
+        positions = THREE_CYCLE_POSITIONS[is_unpinned]
+        order = np.argsort(
+            -np.prod(counts[positions], axis=1, dtype=float), kind="stable"
+        )
+        self._three_cycle_positions = positions[order]
+        self._three_cycle_sources = THREE_CYCLE_SOURCES[is_unpinned][order]
+
     def _get_common_letters(self, text):
         """Get all unique letters of the passed text, sorted by frequency.
 
@@ -193,6 +580,26 @@ class SimpleSolver:
 
         return digram_matrix
 
+    def _to_precision(self, matrix):
+        """Convert a digram matrix to the precision used by this solver.
+
+        Parameters
+        ----------
+        matrix : numpy.array
+            A digram matrix of percentages.
+
+        Returns
+        -------
+        converted_matrix : numpy.array
+            The matrix in the solver precision, which is the passed matrix itself if
+            it already is.
+        """
+
+        if self._precision == "scaled_int":
+            return np.rint(matrix * DIGRAM_SCALE_FACTOR).astype(np.int64)
+
+        return matrix.astype(self._precision, copy=False)
+
     def _score(self, matrix1, matrix2=DIGRAM_MATRIX_ENGLISH):
         """Calculate a score for passed digram matrices using the distance sum method.
 
@@ -220,11 +627,16 @@ class SimpleSolver:
         if matrix1.shape != matrix2.shape:
             raise ValueError("Digram matrices must have the same dimensions")
 
+        # For a (26 x 26) matrix, numpy's fixed cost per operation outweighs the
+        # allocation of the temporary, so one expression is the fastest way.
         return abs(matrix1 - matrix2).sum()
 
-    def _swap_matrix(self, matrix, index1, index2):
+    def _swap_matrix(self, matrix, index1, index2, buffer=None):
         """Swap the matrix rows and columns at the given indices.
 
+        The swap is its own inverse, so calling this again with the same indices
+        reverts it.
+
         Parameters
         ----------
         matrix : numpy.array
@@ -233,6 +645,9 @@ class SimpleSolver:
             The first index to swap between.
         index2 : int
             The second index to swap between.
+        buffer : numpy.array
+            Optional preallocated array of length n used to hold one row or column
+            during the swap, to avoid allocating temporaries in the solve loops.
 
         Raises
         ------
@@ -245,24 +660,32 @@ class SimpleSolver:
         if rows != columns:
             raise ValueError("Matrix must be square.")
 
+        if buffer is None:
+            buffer = np.empty(rows, dtype=matrix.dtype)
+
         # Swap rows:
-        matrix[[index1, index2]] = matrix[[index2, index1]]
+        buffer[:] = matrix[index1]
+        matrix[index1] = matrix[index2]
+        matrix[index2] = buffer
 
         # Swap columns:
-        matrix[:, [index1, index2]] = matrix[:, [index2, index1]]
+        buffer[:] = matrix[:, index1]
+        matrix[:, index1] = matrix[:, index2]
+        matrix[:, index2] = buffer
 
-    def _get_plaintext(self, decryption_key):
-        """Return a plaintext using the passed decryption key.
+    def _get_translation_table(self, decryption_key):
+        """Return a translation table for decrypting with the passed decryption key.
 
         Parameters
         ----------
         decryption_key : list
-            The decryption key to use for generating the plaintext.
+            The decryption key to create a translation table for.
 
         Returns
         -------
-        plaintext : str
-            Plaintext from decrypting the ciphertext using the passed decryption key.
+        translation_table : dict
+            Table for str.translate() mapping each ciphertext letter, in both lower and
+            upper case, to its plaintext letter.
 
         Raises
         ------
@@ -273,28 +696,38 @@ class SimpleSolver:
         if len(set(decryption_key)) != STANDARD_ALPHABET_SIZE:
             raise ValueError("Key must include all letters of the alphabet.")
 
-        # The decryption key will be in order of most common first, so we need to
-        # construct a list of indices where to insert each to get an alphabetical key.
-        indices = [
-            ascii_lowercase.index(letter) for letter in ENGLISH_LETTERS_BY_FREQUENCY
-        ]
-
+        # The decryption key is in order of most common first, just like the English
+        # letters by frequency.
         translation_table = {}
 
-        for key_letter, index in zip(decryption_key, indices):
-            plain_letter = ascii_lowercase[index]
+        for key_letter, plain_letter in zip(
+            decryption_key, ENGLISH_LETTERS_BY_FREQUENCY
+        ):
             translation_table[key_letter] = plain_letter
+            translation_table[key_letter.upper()] = plain_letter.upper()
 
-        plaintext = ""
+        return str.maketrans(translation_table)
 
-        for c in self._ciphertext:
-            is_upper = c in ascii_uppercase
-            letter = translation_table.get(c.lower(), c)
-            if is_upper:
-                letter = letter.upper()
-            plaintext += letter
+    def _get_plaintext(self, decryption_key):
+        """Return a plaintext using the passed decryption key.
 
-        return plaintext
+        Parameters
+        ----------
+        decryption_key : list
+            The decryption key to use for generating the plaintext.
+
+        Returns
+        -------
+        plaintext : str
+            Plaintext from decrypting the ciphertext using the passed decryption key.
+
+        Raises
+        ------
+        ValueError
+            If the passed decryption key does not contain all letters of the alphabet.
+        """
+
+        return self._ciphertext.translate(self._get_translation_table(decryption_key))
 
     def _weighted_random_index_pair(self):
         """Return a random index pair for swapping, weighted by letter frequency.
@@ -311,7 +744,265 @@ class SimpleSolver:
             A pair of random indices between zero and the alphabet length.
         """
 
-        return random.sample(RANDOM_INDEX_DISTRIBUTION, 2)  # nosec:B311
+        distribution = self._random_index_distribution
+
+        # Sample two distinct positions rather than using random.sample(), which is
+        # slower and does not accept arrays.
+        num_positions = len(distribution)
+        i = random.randrange(num_positions)  # nosec:B311
+        j = random.randrange(num_positions - 1)  # nosec:B311
+        if j >= i:
+            j += 1
+
+        return [int(distribution[i]), int(distribution[j])]
+
+    def _get_key_hash(self, key):
+        """Return a 64-bit hash of a decryption key.
+
+        The hash is the XOR of a random number for each letter at each position, so
+        the hash of a key with the letters at positions a and b swapped is:
+
+            key_hash ^ KEY_POSITION_HASHES[a][key[a]] ^ KEY_POSITION_HASHES[b][key[b]]
+                     ^ KEY_POSITION_HASHES[a][key[b]] ^ KEY_POSITION_HASHES[b][key[a]]
+
+        Parameters
+        ----------
+        key : list
+            A common decryption key.
+
+        Returns
+        -------
+        key_hash : int
+            The hash of the key.
+        """
+
+        key_hash = 0
+
+        for position_hashes, letter in zip(KEY_POSITION_HASHES, key):
+            key_hash ^= position_hashes[letter]
+
+        return key_hash
+
+    def _add_candidate(self, key, score):
+        """Record a scored key among the best candidate keys.
+
+        Parameters
+        ----------
+        key : list
+            A common decryption key.
+        score : float
+            The distance sum of the plaintext from decrypting with the key.
+
+        Returns
+        -------
+        score_limit : float
+            The score a key now needs to be below to become a candidate, so callers
+            can skip calling this for keys that would not make it anyway.
+        """
+
+        key = tuple(key)
+
+        if key not in self._candidate_keys:
+            self._num_scored_candidates += 1
+            entry = (-float(score), -self._num_scored_candidates, key)
+
+            if len(self._candidates) < self._num_candidates:
+                heapq.heappush(self._candidates, entry)
+                self._candidate_keys.add(key)
+            elif entry > self._candidates[0]:
+                _, _, removed_key = heapq.heapreplace(self._candidates, entry)
+                self._candidate_keys.discard(removed_key)
+                self._candidate_keys.add(key)
+
+        if len(self._candidates) < self._num_candidates:
+            return math.inf
+
+        return -self._candidates[0][0]
+
+    def _get_compound_moves(self, move_type):
+        """Generate batches of compound moves of a type.
+
+        A move replaces the letter at each of its positions with the letter at the
+        corresponding source position, e.g. positions (i, j, k) with sources (j, k, i)
+        is a 3-cycle, and positions (a, b, c, d) with sources (b, a, d, c) is a double
+        swap.
+
+        Parameters
+        ----------
+        move_type : str
+            One of COMPOUND_MOVES. All 3-cycles of unpinned positions are generated,
+            most likely first, while double swaps are NUM_DOUBLE_SWAP_SAMPLES
+            weighted random samples.
+
+        Yields
+        ------
+        positions, sources : numpy.array
+            (m x k) arrays of the positions and source positions of m moves of k
+            positions each, with at most MOVE_BATCH_SIZE moves per batch.
+        """
+
+        if move_type == "3-cycle":
+            positions = self._three_cycle_positions
+            sources = self._three_cycle_sources
+            for start in range(0, len(positions), MOVE_BATCH_SIZE):
+                end = start + MOVE_BATCH_SIZE
+                yield positions[start:end], sources[start:end]
+            return
+
+        # Double swaps need four distinct unpinned positions.
+        if len(set(self._random_index_distribution)) < 4:
+            return
+
+        for start in range(0, NUM_DOUBLE_SWAP_SAMPLES, MOVE_BATCH_SIZE):
+            moves = []
+            while len(moves) < min(MOVE_BATCH_SIZE, NUM_DOUBLE_SWAP_SAMPLES - start):
+                a, b = self._weighted_random_index_pair()
+                c, d = self._weighted_random_index_pair()
+                if len({a, b, c, d}) == 4:
+                    moves.append((a, b, c, d))
+
+            positions = np.array(moves)
+            yield positions, positions[:, [1, 0, 3, 2]]
+
+    def _score_moves(self, digram_matrix, positions, sources):
+        """Calculate the score change of a batch of compound moves.
+
+        Moving letters between key positions permutes the rows and columns of the
+        digram matrix the same way, so only the rows and columns at the moved
+        positions change. The change in distance sum of each move is computed from
+        those alone, for all moves of the batch at once.
+
+        Parameters
+        ----------
+        digram_matrix : numpy.array
+            The digram matrix of the plaintext from the current key.
+        positions : numpy.array
+            (m x k) array of the key positions changed by each move.
+        sources : numpy.array
+            (m x k) array of the key positions whose letters move to those positions.
+
+        Returns
+        -------
+        deltas : numpy.array
+            The change in distance sum of each move, negative for improvements.
+        """
+
+        model = self._model_matrix
+        num_moves = len(positions)
+        moves = np.arange(num_moves)[:, None]
+
+        # permutations[m, p] is the position whose letter moves to position p.
+        permutations = np.tile(np.arange(STANDARD_ALPHABET_SIZE), (num_moves, 1))
+        permutations[moves, positions] = sources
+
+        distances = np.abs(digram_matrix - model)
+
+        # The moved rows, (m x k x n).
+        new_rows = digram_matrix[sources[:, :, None], permutations[:, None, :]]
+        row_deltas = np.abs(new_rows - model[positions]).sum(axis=(1, 2))
+        row_deltas -= distances[positions].sum(axis=(1, 2))
+
+        # The moved columns, (m x n x k), excluding the rows already counted above.
+        new_columns = digram_matrix[permutations[:, :, None], sources[:, None, :]]
+        other_rows = np.ones((num_moves, STANDARD_ALPHABET_SIZE), dtype=bool)
+        other_rows[moves, positions] = False
+        column_deltas = np.abs(new_columns - model.T[positions].transpose(0, 2, 1))
+        column_deltas -= distances.T[positions].transpose(0, 2, 1)
+        column_deltas = (column_deltas * other_rows[:, :, None]).sum(axis=(1, 2))
+
+        return row_deltas + column_deltas
+
+    def _apply_compound_move(self, key, digram_matrix, best_score):
+        """Apply the best improving compound move to a key, if there is one.
+
+        The move types set for the current solve are tried in order, one batch at a
+        time, and the best move of the first batch with an improvement is applied.
+
+        Parameters
+        ----------
+        key : list
+            The current common decryption key, modified in-place.
+        digram_matrix : numpy.array
+            The digram matrix of the plaintext from the key, modified in-place.
+        best_score : float
+            The distance sum of the digram matrix.
+
+        Returns
+        -------
+        score : float
+            The new distance sum, or None if no move improved it.
+        """
+
+        for move_type in self._compound_moves:
+            for positions, sources in self._get_compound_moves(move_type):
+                deltas = self._score_moves(digram_matrix, positions, sources)
+                self._statistics["moves_evaluated"] += len(deltas)
+                best_move = int(np.argmin(deltas))
+
+                if deltas[best_move] >= 0:
+                    continue
+
+                permutation = list(range(STANDARD_ALPHABET_SIZE))
+                for position, source in zip(positions[best_move], sources[best_move]):
+                    permutation[position] = source
+
+                # Score the moved matrix in full, so rounding in the deltas can never
+                # make the search cycle.
+                moved_matrix = digram_matrix[np.ix_(permutation, permutation)]
+                score = self._score(moved_matrix, self._model_matrix)
+
+                if score < best_score:
+                    digram_matrix[:] = moved_matrix
+                    key[:] = [key[source] for source in permutation]
+                    self._statistics["moves_accepted"] += 1
+                    return score
+
+        return None
+
+    def _check_progress(self, iterations, best_score):
+        """Stop if the current solve is cancelled, and report its progress otherwise.
+
+        Parameters
+        ----------
+        iterations : int
+            The number of iterations of the current run so far.
+        best_score : float
+            The best distance sum of the current run so far.
+
+        Raises
+        ------
+        SolveCancelled
+            If the cancellation token of the solve is set.
+        """
+
+        if self._cancel_token is not None and self._cancel_token.is_set():
+            raise SolveCancelled("Solve was cancelled.")
+
+        if self._progress is not None:
+            self._progress(
+                {
+                    "run": self._statistics["runs"] + 1,
+                    "iterations": iterations,
+                    "best_score": float(best_score),
+                }
+            )
+
+    def _get_swap_pairs(self):
+        """Return the swaps of the deterministic solver, see ._solve_deterministic().
+
+        Returns
+        -------
+        swap_pairs : list
+            The (low, high) key position pairs in the order they are tried, leaving
+            out pinned positions.
+        """
+
+        return [
+            (j, j + i)
+            for i in range(1, STANDARD_ALPHABET_SIZE)
+            for j in range(STANDARD_ALPHABET_SIZE - i)
+            if j not in self._pins and j + i not in self._pins
+        ]
 
     def _solve_deterministic(self):
         """Solve the cipher using predefined, structured digram matrix swaps.
@@ -328,17 +1019,19 @@ class SimpleSolver:
         3. Generate a digram matrix from this plaintext.
         4. Calculate a score from this digram matrix using the distance sum method.
         5. Repeat the following steps:
-            6a. Make a copy of the digram matrix.
-            6b. Swap rows/elements of this putative digram matrix at index (0, 1),
+            6a. Swap rows/elements of the digram matrix at index (0, 1),
                 (1, 2), (2, 3) etc. until the last index of the pair reaches the
                 alphabet length. Then swap rows/columns at index (0, 2), (1, 3), (2, 4)
                 etc. until the last index in the pair reaches the alphabet length. The
                 last swap in this nested loop will be (0, 25).
-            6c. After each swap, calculate a score from the modified digram matrix.
-            6d. If the score improved, save the modified digram matrix as the new best
-                digram matrix, make the same swap in the key and save it as the new best
-                key, and save the improved score as the new best score.
-        7. The algorithm is done when all swaps have been made.
+            6b. After each swap, calculate a score from the modified digram matrix.
+            6c. If the score improved, keep the modified digram matrix, make the same
+                swap in the key and save the improved score as the new best score.
+                Otherwise, swap back to restore the previous digram matrix.
+        7. The algorithm is done when all swaps have been made, unless compound
+           moves are enabled, see .solve(). Then the best improving compound move is
+           applied and all swaps are made again, until no compound move improves the
+           score.
         """
 
         # We need this as a list so we can modify it in-place.
@@ -346,26 +1039,63 @@ class SimpleSolver:
 
         # Generate digram matrix from the corresponding plaintext.
         putative_plaintext = self._get_plaintext(key)
-        digram_matrix = self._get_digram_matrix(putative_plaintext)
+        digram_matrix = self._to_precision(self._get_digram_matrix(putative_plaintext))
+
+        # Preallocated buffer for the rows and columns being swapped.
+        swap_buffer = np.empty(STANDARD_ALPHABET_SIZE, dtype=digram_matrix.dtype)
 
         # Calculate initial score.
-        best_score = self._score(digram_matrix)
+        best_score = self._score(digram_matrix, self._model_matrix)
+        candidate_limit = self._add_candidate(key, best_score)
+
+        swap_pairs = self._get_swap_pairs()
 
-        # Loop and swap rows/columns in digram matrix.
-        for i in range(1, STANDARD_ALPHABET_SIZE):
-            for j in range(STANDARD_ALPHABET_SIZE - i):
+        # Counted in local variables, and added to the statistics when done.
+        num_passes = 0
+        num_accepted = 0
+
+        is_monitored = self._cancel_token is not None or self._progress is not None
+
+        # Loop and swap rows/columns in digram matrix, and make a pass again after each
+        # improving compound move, if any.
+        while True:
+            if is_monitored:
+                self._check_progress(num_passes * len(swap_pairs), best_score)
+
+            num_passes += 1
+
+            for a, b in swap_pairs:
                 # Try a potential swap in the digram matrix.
-                d = np.copy(digram_matrix)
-                self._swap_matrix(d, j, j + i)
+                self._swap_matrix(digram_matrix, a, b, buffer=swap_buffer)
+
+                score = self._score(digram_matrix, self._model_matrix)
 
-                score = self._score(d)
+                if score < candidate_limit:
+                    candidate = key[:]
+                    candidate[a], candidate[b] = candidate[b], candidate[a]
+                    candidate_limit = self._add_candidate(candidate, score)
 
                 if score < best_score:
-                    # The score improved, so commit this change in both the digram
-                    # matrix and the key.
-                    digram_matrix = np.copy(d)
-                    key[j], key[j + i] = key[j + i], key[j]
+                    # The score improved, so commit this change in the key too.
+                    key[a], key[b] = key[b], key[a]
                     best_score = score
+                    num_accepted += 1
+                else:
+                    # Revert the swap.
+                    self._swap_matrix(digram_matrix, a, b, buffer=swap_buffer)
+
+            score = self._apply_compound_move(key, digram_matrix, best_score)
+
+            if score is None:
+                break
+
+            best_score = score
+            candidate_limit = self._add_candidate(key, best_score)
+
+        num_swaps = num_passes * len(swap_pairs)
+        self._statistics.update(
+            iterations=num_swaps, swaps_evaluated=num_swaps, swaps_accepted=num_accepted
+        )
 
         self._decryption_key = key[:]
 
@@ -382,13 +1112,21 @@ class SimpleSolver:
         3. Generate a digram matrix from this plaintext.
         4. Calculate a score from this digram matrix using the distance sum method.
         5. Repeat the following steps:
-            6a. Make a copy of the digram matrix.
-            6b. Swap two rows/column at random in this putative digram matrix.
-            6c. Calculate a score for the putative digram matrix.
-            6d. If the score improved, save the putative digram matrix as the new best
-                digram matrix, make the same swap in the key, and save the improved
-                score as the new best score.
-        7. The algorithm is done when the score hasn't improved for 2,000 iterations.
+            6a. Swap two rows/column at random in the digram matrix.
+            6b. Calculate a score for the modified digram matrix.
+            6c. If the score improved, keep the modified digram matrix, make the same
+                swap in the key, and save the improved score as the new best score.
+                Otherwise, swap back to restore the previous digram matrix.
+        7. Keep track of which swaps have been tried since the last improvement. When
+           the probability of drawing one that hasn't drops below
+           UNTRIED_SWAP_PROBABILITY_THRESHOLD, stop drawing at random and try the
+           remaining swaps in order, most likely first.
+        8. The algorithm is done when every possible swap has been tried without
+           improvement, i.e. the neighbourhood of the key is exhausted, or as a
+           safeguard when the score hasn't improved for
+           MAX_ITERATIONS_WITHOUT_IMPROVEMENT iterations. If compound moves are
+           enabled, see .solve(), an exhausted neighbourhood is first escaped with
+           the best improving compound move, if there is one.
         """
 
         # We need the key as a list so we can modify it in-place.
@@ -396,54 +1134,376 @@ class SimpleSolver:
 
         # Generate an initial digram matrix.
         putative_plaintext = self._get_plaintext(key)
-        digram_matrix = self._get_digram_matrix(putative_plaintext)
+        digram_matrix = self._to_precision(self._get_digram_matrix(putative_plaintext))
+
+        # Preallocated buffer for the rows and columns being swapped.
+        swap_buffer = np.empty(STANDARD_ALPHABET_SIZE, dtype=digram_matrix.dtype)
+
+        best_score = self._score(digram_matrix, self._model_matrix)
+        candidate_limit = self._add_candidate(key, best_score)
 
-        best_score = self._score(digram_matrix)
+        # The swaps between unpinned positions, which are the only ones drawn.
+        index_pairs = self._index_pairs
+        pair_probabilities = self._pair_probabilities
+        distinct_pair_probability = self._distinct_pair_probability
+
+        if not index_pairs:
+            # All letters but at most one are pinned, so the key is already known.
+            self._decryption_key = key[:]
+            return
 
         iterations_since_last_improvement = 0
 
-        # Loop and swap elements in the key at random until the score hasn't improved
-        # for 1,000 iterations.
-        while iterations_since_last_improvement < 2000:
-            a, b = self._weighted_random_index_pair()
+        # Swap pairs tried since the last improvement, as (low, high) index tuples, and
+        # the total probability of drawing a pair that is not among them.
+        tried_pairs = set()
+        untried_probability = distinct_pair_probability
+
+        # Untried pairs left to try in order once random draws have become unlikely to
+        # find them, with the most likely pair last.
+        remaining_pairs = None
+
+        score_cache = self._score_cache if self._score_cache_size > 0 else None
+        key_hash = self._get_key_hash(key) if score_cache is not None else None
+
+        # Counted in local variables, and added to the statistics when done.
+        num_iterations = 0
+        num_evaluated = 0
+        num_accepted = 0
+        num_cache_hits = 0
+
+        is_monitored = self._cancel_token is not None or self._progress is not None
 
-            putative_digram_matrix = np.copy(digram_matrix)
-            self._swap_matrix(putative_digram_matrix, a, b)
-            score = self._score(putative_digram_matrix)
+        # Loop and swap elements in the key until the neighbourhood of the current key
+        # is exhausted.
+        while iterations_since_last_improvement < MAX_ITERATIONS_WITHOUT_IMPROVEMENT:
+            num_iterations += 1
+
+            if is_monitored and not num_iterations % PROGRESS_INTERVAL:
+                self._check_progress(num_iterations, best_score)
+
+            if remaining_pairs:
+                a, b = remaining_pairs.pop()
+            else:
+                a, b = self._weighted_random_index_pair()
+
+            pair = (a, b) if a < b else (b, a)
+
+            # Swaps already rejected for the current key, and non-swaps, can not improve
+            # the score, so don't score them again.
+            if a == b or pair in tried_pairs:
+                iterations_since_last_improvement += 1
+                continue
+
+            score = None
+            if score_cache is not None:
+                position_hashes_a = KEY_POSITION_HASHES[a]
+                position_hashes_b = KEY_POSITION_HASHES[b]
+                swapped_key_hash = (
+                    key_hash
+                    ^ position_hashes_a[key[a]]
+                    ^ position_hashes_b[key[b]]
+                    ^ position_hashes_a[key[b]]
+                    ^ position_hashes_b[key[a]]
+                )
+                score = score_cache.get(swapped_key_hash)
+
+            if score is None:
+                self._swap_matrix(digram_matrix, a, b, buffer=swap_buffer)
+                score = self._score(digram_matrix, self._model_matrix)
+                is_swapped = True
+                num_evaluated += 1
+
+                if score_cache is not None:
+                    score_cache[swapped_key_hash] = score
+                    if len(score_cache) > self._score_cache_size:
+                        score_cache.popitem(last=False)
+            else:
+                score_cache.move_to_end(swapped_key_hash)
+                is_swapped = False
+                num_cache_hits += 1
+
+            if score < candidate_limit:
+                candidate = key[:]
+                candidate[a], candidate[b] = candidate[b], candidate[a]
+                candidate_limit = self._add_candidate(candidate, score)
 
             if score < best_score:
+                if not is_swapped:
+                    self._swap_matrix(digram_matrix, a, b, buffer=swap_buffer)
                 best_score = score
-                digram_matrix = np.copy(putative_digram_matrix)
                 key[a], key[b] = key[b], key[a]
+                key_hash = swapped_key_hash if score_cache is not None else None
+                num_accepted += 1
                 iterations_since_last_improvement = 0
-            else:
-                iterations_since_last_improvement += 1
+                tried_pairs.clear()
+                untried_probability = distinct_pair_probability
+                remaining_pairs = None
+                continue
+
+            if is_swapped:
+                # Revert the swap.
+                self._swap_matrix(digram_matrix, a, b, buffer=swap_buffer)
+
+            iterations_since_last_improvement += 1
+
+            tried_pairs.add(pair)
+            untried_probability -= pair_probabilities[a, b]
+
+            if len(tried_pairs) == len(index_pairs):
+                # No single swap improves the key, but a compound move might.
+                score = self._apply_compound_move(key, digram_matrix, best_score)
+
+                if score is None:
+                    break
+
+                best_score = score
+                candidate_limit = self._add_candidate(key, best_score)
+                if score_cache is not None:
+                    key_hash = self._get_key_hash(key)
+                iterations_since_last_improvement = 0
+                tried_pairs.clear()
+                untried_probability = distinct_pair_probability
+                remaining_pairs = None
+                continue
+
+            # Random draws now mostly repeat swaps already known not to help, so try
+            # the rest of the neighbourhood in order instead.
+            is_unlikely = untried_probability < UNTRIED_SWAP_PROBABILITY_THRESHOLD
+            if remaining_pairs is None and is_unlikely:
+                remaining_pairs = [p for p in index_pairs if p not in tried_pairs]
+
+        self._statistics.update(
+            iterations=num_iterations,
+            swaps_evaluated=num_evaluated,
+            swaps_accepted=num_accepted,
+        )
+        if score_cache is not None:
+            self._statistics.update(
+                cache_hits=num_cache_hits, cache_misses=num_evaluated
+            )
 
         self._decryption_key = key[:]
 
-    def solve(self, method="random"):
+    def identify_language(self, models):
+        """Find the language model the ciphertext fits best, and use it from now on.
+
+        Rather than solving the cipher once per language, a short solve is run for
+        all languages at once: the digram matrices of the putative plaintexts of all
+        languages are stacked into one array, as are the digram matrices of the
+        models, and each swap is made and scored for all of them together. The
+        swaps are those of the deterministic solver, for
+        LANGUAGE_IDENTIFICATION_PASSES passes, starting from keys based on the
+        letter frequencies of each language.
+
+        The model with the lowest distance sum is then used by .solve() and
+        .reset(), and the decryption key is set to the best key found for it, so
+        the following solve continues from there.
+
+        Parameters
+        ----------
+        models : mapping
+            Language model tables by language name, each like the model of
+            SimpleSolver, e.g. from cipher_solver.shared.language_tables(). All
+            digram matrices must be indexed by the positions of the plaintext
+            letters in ENGLISH_LETTERS_BY_FREQUENCY, like DIGRAM_MATRIX_ENGLISH.
+
+        Returns
+        -------
+        language : str
+            The name of the best fitting model.
+
+        Raises
+        ------
+        ValueError
+            If no models are passed.
+            If a digram matrix is not (26 x 26).
+        """
+
+        names = list(models)
+
+        if not names:
+            raise ValueError("At least one language model is needed.")
+
+        model_matrices = np.stack(
+            [
+                self._to_precision(np.asarray(models[name]["digram_matrix"]))
+                for name in names
+            ]
+        )
+
+        if model_matrices.shape[1:] != (STANDARD_ALPHABET_SIZE,) * 2:
+            raise ValueError("Digram matrices must have the same dimensions")
+
+        # The keys as ciphertext letter positions in ENGLISH_LETTERS_BY_FREQUENCY, to
+        # index the digram matrix of the ciphertext with.
+        keys = np.array(
+            [
+                [
+                    ENGLISH_LETTERS_BY_FREQUENCY.index(c)
+                    for c in self._get_initial_key(
+                        self._ciphertext, self._get_position_order(models[name])
+                    )
+                ]
+                for name in names
+            ]
+        )
+
+        # Decrypting permutes the rows and columns of the ciphertext digram matrix, so
+        # the putative plaintext digram matrices are taken from it directly.
+        cipher_matrix = self._to_precision(self._get_digram_matrix(self._ciphertext))
+        digram_matrices = cipher_matrix[keys[:, :, None], keys[:, None, :]]
+
+        scores = abs(digram_matrices - model_matrices).sum(axis=(1, 2))
+        swap_pairs = self._get_swap_pairs()
+        order = np.arange(STANDARD_ALPHABET_SIZE)
+
+        for _ in range(LANGUAGE_IDENTIFICATION_PASSES):
+            for a, b in swap_pairs:
+                order[a], order[b] = b, a
+                swapped_matrices = digram_matrices[:, order][:, :, order]
+                order[a], order[b] = a, b
+
+                swapped_scores = abs(swapped_matrices - model_matrices).sum(axis=(1, 2))
+                improved = swapped_scores < scores
+
+                if improved.any():
+                    digram_matrices[improved] = swapped_matrices[improved]
+                    scores[improved] = swapped_scores[improved]
+                    keys[np.ix_(improved, [a, b])] = keys[np.ix_(improved, [b, a])]
+
+        best = int(scores.argmin())
+        self._set_model(models[names[best]])
+        self._decryption_key = [ENGLISH_LETTERS_BY_FREQUENCY[i] for i in keys[best]]
+
+        return names[best]
+
+    def solve(
+        self,
+        method="random",
+        restarts=1,
+        verifier=None,
+        num_candidates=1,
+        compound_moves=(),
+        cancel_token=None,
+        progress=None,
+    ):
         """Solve the cipher.
 
-        Run the solver and save the resulting decryption key.
+        Run the solver and save the resulting decryption key. With more than one
+        restart, the solver is run again from the initial key and the best of the
+        resulting keys is kept. Without a verifier, the best key is the one with the
+        lowest distance sum. With a verifier, it is the one whose plaintext has the
+        highest verification score, and no more restarts are made as soon as a
+        plaintext is verified.
 
         Parameters
         ----------
         method : str
             The method to use when solving, currently "random" or "deterministic".
+        restarts : int
+            The maximum number of times to run the solver.
+        verifier : cipher_solver.verify.WordVerifier
+            Optional verifier used to pick the best key and to stop early.
+        num_candidates : int
+            The number of best distinct keys scored during all runs to keep as
+            candidates, see .candidates().
+        compound_moves : sequence
+            Move types from COMPOUND_MOVES, "3-cycle" and "double-swap", to try in
+            order when no single swap improves the key. Moving three or four letters
+            at once escapes local minima that otherwise take restarts to get out of.
+            The moves are scored in batches from the changed digram matrix rows and
+            columns only, see ._score_moves().
+        cancel_token : threading.Event
+            Optional token, checked every PROGRESS_INTERVAL iterations, that stops
+            the solve as soon as it is set, e.g. from another thread. The decryption
+            key is then the best one of the runs completed so far, if any, and
+            otherwise left as it was before the solve.
+        progress : callable
+            Optional function called every PROGRESS_INTERVAL iterations with a dict
+            of the current "run", its "iterations" so far and its "best_score".
 
         Raises
         ------
         ValueError
             If the passed method is unknown.
+            If the number of restarts is less than one.
+            If the number of candidates is less than one.
+            If a compound move type is unknown.
+        SolveCancelled
+            If the cancellation token is set before the solve is done.
         """
 
         if method == "random":
-            self._solve_random()
+            solve_method = self._solve_random
         elif method == "deterministic":
-            self._solve_deterministic()
+            solve_method = self._solve_deterministic
         else:
             raise ValueError(f"Unknown method {method}")
 
+        if restarts < 1:
+            raise ValueError("Number of restarts must be at least one.")
+
+        if num_candidates < 1:
+            raise ValueError("Number of candidates must be at least one.")
+
+        for move_type in compound_moves:
+            if move_type not in COMPOUND_MOVES:
+                raise ValueError(f"Unknown compound move {move_type}")
+
+        self._compound_moves = tuple(compound_moves)
+        self._statistics = Counter()
+        self._num_candidates = num_candidates
+        self._candidates = []
+        self._candidate_keys = set()
+        self._num_scored_candidates = 0
+        self._cancel_token = cancel_token
+        self._progress = progress
+
+        best_key = None
+        best_fitness = None
+
+        for restart in range(restarts):
+            try:
+                if restart > 0:
+                    self.reset()
+
+                if cancel_token is not None and cancel_token.is_set():
+                    raise SolveCancelled("Solve was cancelled.")
+
+                solve_method()
+            except SolveCancelled:
+                # Keep the best key of the runs completed so far, if any.
+                if best_key is not None:
+                    self._decryption_key = best_key
+                raise
+            self._statistics["runs"] += 1
+
+            if restarts == 1 and verifier is None:
+                return
+
+            # Lower fitness is better, like the distance sum.
+            plaintext = self.plaintext()
+            verified = False
+            if verifier is None:
+                fitness = self._score(
+                    self._to_precision(self._get_digram_matrix(plaintext)),
+                    self._model_matrix,
+                )
+            else:
+                verification_score = verifier.score(plaintext)
+                verified = verification_score >= verifier.threshold
+                fitness = -verification_score
+
+            if best_fitness is None or fitness < best_fitness:
+                best_key = self._decryption_key[:]
+                best_fitness = fitness
+
+            if verified:
+                break
+
+        self._decryption_key = best_key
+
     def plaintext(self):
         """Return a plaintext using the current decryption key.
 
@@ -455,6 +1515,89 @@ class SimpleSolver:
 
         return self._get_plaintext(self._decryption_key)
 
+    def iter_plaintext(self, chunk_size=DEFAULT_CHUNK_SIZE, ciphertext_file=None):
+        """Decrypt using the current decryption key, one chunk at a time.
+
+        Every chunk is decrypted with the same precompiled translation table, so this
+        works on texts of any size without holding the whole plaintext in memory. By
+        default the ciphertext of the solver is decrypted, but a larger ciphertext that
+        the solver was given a sample of can be streamed from a file instead.
+
+        Parameters
+        ----------
+        chunk_size : int
+            The number of characters to decrypt at a time.
+        ciphertext_file : str or file object
+            Optional path to, or text file object with, a ciphertext to decrypt
+            instead of the one of the solver.
+
+        Returns
+        -------
+        plaintext_chunks : iterator
+            The plaintext in chunks of at most chunk_size characters.
+
+        Raises
+        ------
+        ValueError
+            If the chunk size is less than one.
+        """
+
+        if chunk_size < 1:
+            raise ValueError("Chunk size must be at least one.")
+
+        translation_table = self._get_translation_table(self._decryption_key)
+
+        return self._translate_chunks(chunk_size, translation_table, ciphertext_file)
+
+    def _translate_chunks(self, chunk_size, translation_table, ciphertext_file):
+        """Yield translated chunks of at most chunk_size characters of a ciphertext."""
+
+        if ciphertext_file is None:
+            for start in range(0, len(self._ciphertext), chunk_size):
+                end = start + chunk_size
+                yield self._ciphertext[start:end].translate(translation_table)
+            return
+
+        if isinstance(ciphertext_file, (str, os.PathLike)):
+            with open(ciphertext_file) as f:
+                yield from self._translate_chunks(chunk_size, translation_table, f)
+            return
+
+        while True:
+            chunk = ciphertext_file.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk.translate(translation_table)
+
+    def write_plaintext(
+        self, path_or_file, chunk_size=DEFAULT_CHUNK_SIZE, ciphertext_file=None
+    ):
+        """Write the plaintext using the current decryption key, chunk by chunk.
+
+        Parameters
+        ----------
+        path_or_file : str or file object
+            The path of the file to write to, or a text file object to write to.
+        chunk_size : int
+            The number of characters to decrypt and write at a time.
+        ciphertext_file : str or file object
+            Optional path to, or text file object with, a ciphertext to decrypt
+            instead of the one of the solver, see .iter_plaintext().
+
+        Raises
+        ------
+        ValueError
+            If the chunk size is less than one.
+        """
+
+        chunks = self.iter_plaintext(chunk_size, ciphertext_file)
+
+        if isinstance(path_or_file, (str, os.PathLike)):
+            with open(path_or_file, "w") as f:
+                f.writelines(chunks)
+        else:
+            path_or_file.writelines(chunks)
+
     def decryption_key(self):
         """Return the current alphabetical decryption key.
 
@@ -466,6 +1609,80 @@ class SimpleSolver:
 
         return common_to_alphabetical_key(self._decryption_key)
 
+    def candidates(self):
+        """Return the best distinct keys found by the last solve, with confidences.
+
+        The confidence of each key is derived from how much worse its distance sum is
+        than that of the best candidate, relative to the latter, and the confidences
+        of all candidates sum to one.
+
+        Returns
+        -------
+        candidates : list
+            (alphabetical_key, confidence) tuples, most confident first.
+        """
+
+        scored_keys = sorted(
+            (-score, -sequence_number, key)
+            for score, sequence_number, key in self._candidates
+        )
+
+        if not scored_keys:
+            return []
+
+        best_score = scored_keys[0][0]
+        weights = [
+            math.exp(-CONFIDENCE_SHARPNESS * (score - best_score) / (best_score or 1))
+            for score, _, _ in scored_keys
+        ]
+        total_weight = sum(weights)
+
+        return [
+            (common_to_alphabetical_key(key), weight / total_weight)
+            for (_, _, key), weight in zip(scored_keys, weights)
+        ]
+
+    def ambiguous_letters(self):
+        """Return the plaintext letters the candidate keys disagree on.
+
+        Returns
+        -------
+        ambiguous_letters : dict
+            Maps each plaintext letter that is decrypted from different ciphertext
+            letters by different candidates, to a dict from each of those ciphertext
+            letters to the summed confidence of the candidates using it.
+        """
+
+        letter_confidences = {}
+
+        for alphabetical_key, confidence in self.candidates():
+            for plain_letter, key_letter in zip(ascii_lowercase, alphabetical_key):
+                confidences = letter_confidences.setdefault(plain_letter, {})
+                confidences[key_letter] = confidences.get(key_letter, 0) + confidence
+
+        return {
+            plain_letter: confidences
+            for plain_letter, confidences in letter_confidences.items()
+            if len(confidences) > 1
+        }
+
+    def statistics(self):
+        """Return counts of the work done by the last solve.
+
+        The counts are collected in local variables while solving and added up once
+        per run, so keeping them costs nothing noticeable in the solve loops.
+
+        Returns
+        -------
+        statistics : dict
+            The number of solver "runs", at most the restarts, loop "iterations",
+            single swaps scored in "swaps_evaluated" and kept in "swaps_accepted", and
+            likewise compound "moves_evaluated" and "moves_accepted". With a score
+            cache, also the "cache_hits" and "cache_misses" of the random solver.
+        """
+
+        return dict(self._statistics)
+
     def reset(self):
         """Reset the solver to its initial state.
 
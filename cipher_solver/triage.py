@@ -0,0 +1,155 @@
+import numpy as np
+
+from cipher_solver.consts import ENGLISH_LETTER_FREQUENCIES, STANDARD_ALPHABET_SIZE
+
+# English letter frequencies in decreasing order. A substitution only relabels letters,
+# so a ciphertext has the same sorted frequency profile as its plaintext.
+ENGLISH_FREQUENCY_SHAPE = np.sort(list(ENGLISH_LETTER_FREQUENCIES.values()))[::-1]
+ENGLISH_FREQUENCY_SHAPE = ENGLISH_FREQUENCY_SHAPE / ENGLISH_FREQUENCY_SHAPE.sum()
+
+# The thresholds below were calibrated on random windows of the texts/ plaintexts,
+# encrypted with random substitutions, with and without word boundaries, and with
+# columnar transpositions, Vigenere ciphers with keys of 3 to 12 letters, and random
+# letters as counterexamples. From MIN_TRIAGE_LETTERS letters, every substitution is
+# accepted, and at most a few percent of the counterexamples, falling to none from
+# about 500 letters.
+
+# Fewest letters to classify a text by. Statistics of shorter texts vary too much to
+# tell substitutions from other ciphers, so they are never rejected.
+MIN_TRIAGE_LETTERS = 250
+
+# Lowest index of coincidence of a substitution of English, which is about 0.066 for
+# long texts. Polyalphabetic ciphers flatten the letter frequencies towards the 0.038
+# of random letters.
+MIN_INDEX_OF_COINCIDENCE = 0.055
+
+# Highest sum of absolute differences between the sorted letter frequencies of a text
+# and ENGLISH_FREQUENCY_SHAPE for a substitution of English.
+MAX_FREQUENCY_SHAPE_DISTANCE = 0.25
+
+# Lowest digram excess of a substitution of English, where the digram excess is the
+# index of coincidence of digrams relative to what independent letters would give,
+# about 2.2 for English with word boundaries and 1.7 without. Transpositions keep the
+# letter frequencies but break up the digrams, which gives about 1.
+MIN_DIGRAM_EXCESS = 1.25
+
+# Digram excess above which a text with a low index of coincidence is considered
+# polyalphabetic rather than random, since periodic keys keep some digram structure.
+MIN_POLYALPHABETIC_DIGRAM_EXCESS = 1.2
+
+
+def letter_statistics(text):
+    """Compute the statistics a text is classified by.
+
+    All statistics are unchanged by a substitution, so they can be compared to those
+    of English without knowing the key. Only letters are counted, ignoring case, and
+    only pairs of adjacent letters count as digrams.
+
+    Parameters
+    ----------
+    text : str
+        The text to compute statistics for.
+
+    Returns
+    -------
+    statistics : dict
+        The number of "letters", the "index_of_coincidence", i.e. the probability
+        of two random letters of the text being the same, the
+        "frequency_shape_distance" from English, see MAX_FREQUENCY_SHAPE_DISTANCE,
+        and the "digram_excess", see MIN_DIGRAM_EXCESS. Statistics that need more
+        letters than the text has are zero.
+    """
+
+    codes = np.frombuffer(text.lower().encode("ascii", "replace"), dtype=np.uint8)
+    codes = codes - ord("a")
+
+    # Characters before "a" wrap around, so all non-letters are at least 26.
+    is_letter = codes < STANDARD_ALPHABET_SIZE
+    letters = codes[is_letter]
+    num_letters = len(letters)
+
+    statistics = {
+        "letters": num_letters,
+        "index_of_coincidence": 0.0,
+        "frequency_shape_distance": 0.0,
+        "digram_excess": 0.0,
+    }
+
+    if num_letters < 2:
+        return statistics
+
+    counts = np.bincount(letters, minlength=STANDARD_ALPHABET_SIZE)
+    index_of_coincidence = (counts * (counts - 1)).sum() / (
+        num_letters * (num_letters - 1)
+    )
+    shape = np.sort(counts)[::-1] / num_letters
+
+    is_digram = is_letter[:-1] & is_letter[1:]
+    digrams = codes[:-1][is_digram].astype(np.int64) * STANDARD_ALPHABET_SIZE
+    digrams += codes[1:][is_digram]
+    num_digrams = len(digrams)
+
+    statistics["index_of_coincidence"] = float(index_of_coincidence)
+    statistics["frequency_shape_distance"] = float(
+        np.abs(shape - ENGLISH_FREQUENCY_SHAPE).sum()
+    )
+
+    if num_digrams >= 2 and index_of_coincidence > 0:
+        digram_counts = np.bincount(digrams, minlength=STANDARD_ALPHABET_SIZE**2)
+        digram_index_of_coincidence = (digram_counts * (digram_counts - 1)).sum() / (
+            num_digrams * (num_digrams - 1)
+        )
+        statistics["digram_excess"] = float(
+            digram_index_of_coincidence / index_of_coincidence**2
+        )
+
+    return statistics
+
+
+def classify(text):
+    """Classify a text by how likely it is to be a substitution of English.
+
+    This takes a single pass over the text, so it can be used to skip texts that the
+    solver has no chance of solving before spending any time on them.
+
+    Parameters
+    ----------
+    text : str
+        The ciphertext to classify.
+
+    Returns
+    -------
+    classification : dict
+        The statistics from letter_statistics(), a "label", and whether solving is
+        "plausible". The label is one of:
+
+        "substitution" : Looks like a substitution of English.
+        "too_short" : Too short to tell, see MIN_TRIAGE_LETTERS. Still plausible.
+        "transposition" : English letter frequencies, but not English digrams.
+        "polyalphabetic" : Flattened letter frequencies, with some digram structure.
+        "random" : Letter frequencies and digrams like random letters.
+        "non_english" : Letters repeat as in a language, but not with the
+                        frequencies of English.
+    """
+
+    statistics = letter_statistics(text)
+
+    if statistics["letters"] < MIN_TRIAGE_LETTERS:
+        label = "too_short"
+    elif statistics["index_of_coincidence"] < MIN_INDEX_OF_COINCIDENCE:
+        if statistics["digram_excess"] >= MIN_POLYALPHABETIC_DIGRAM_EXCESS:
+            label = "polyalphabetic"
+        else:
+            label = "random"
+    elif statistics["frequency_shape_distance"] > MAX_FREQUENCY_SHAPE_DISTANCE:
+        label = "non_english"
+    elif statistics["digram_excess"] < MIN_DIGRAM_EXCESS:
+        label = "transposition"
+    else:
+        label = "substitution"
+
+    return {
+        "label": label,
+        "plausible": label in ("substitution", "too_short"),
+        **statistics,
+    }
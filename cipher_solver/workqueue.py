@@ -0,0 +1,692 @@
+import hashlib
+import json
+import multiprocessing
+import os
+import socket
+import threading
+import time
+from queue import Empty
+
+from cipher_solver.batch import (
+    PROGRESS_INTERVAL,
+    BatchProgress,
+    find_input_files,
+    get_output_paths,
+    open_manifest,
+    read_manifest,
+    record_result,
+    solve_file,
+)
+from cipher_solver.shared import SharedModel
+
+# Seconds between heartbeats of a worker for the file it is solving.
+HEARTBEAT_INTERVAL = 5.0
+
+# Seconds without a heartbeat after which a claimed file is put back in the queue.
+STALE_CLAIM_TIMEOUT = 60.0
+
+# Seconds to wait before checking the queue again when there is nothing to do.
+POLL_INTERVAL = 1.0
+
+# Name of the file holding the solve settings in a queue directory. It is written
+# after the work units, so workers can start before the coordinator has filled the
+# queue.
+SETTINGS_NAME = "settings.json"
+
+
+def get_worker_id():
+    """Return an identifier of the calling process, unique among all nodes."""
+
+    hostname = socket.gethostname().replace(".", "-")
+    return f"{hostname}-{os.getpid()}"
+
+
+def _write_json(path, data):
+    """Write JSON to a file atomically, so readers never see a partial file."""
+
+    temporary_path = f"{path}.{get_worker_id()}.tmp"
+
+    with open(temporary_path, "w") as f:
+        json.dump(data, f)
+
+    os.replace(temporary_path, path)
+
+
+class WorkQueue:
+    """Queue of files to solve, kept in a directory shared between nodes.
+
+    Each work unit is a JSON file, which moves between three subdirectories:
+
+    "pending" : Units waiting to be solved.
+    "claimed" : Units being solved, with the claiming worker in their file names.
+    "results" : Results of solved units, waiting to be merged by the coordinator.
+
+    Units are claimed by renaming them from "pending" to "claimed", which is atomic,
+    so only one worker can claim each unit. A worker sends heartbeats by updating the
+    modification time of its claim, and claims without a heartbeat for too long are
+    considered abandoned and put back in "pending". Only plain file operations are
+    used, so the queue works on any shared filesystem without other services.
+    """
+
+    def __init__(self, directory):
+        """Create new queue, or open an existing one.
+
+        Parameters
+        ----------
+        directory : str
+            The queue directory, which is created if needed.
+        """
+
+        self.directory = directory
+        self._pending = os.path.join(directory, "pending")
+        self._claimed = os.path.join(directory, "claimed")
+        self._results = os.path.join(directory, "results")
+
+        for subdirectory in (self._pending, self._claimed, self._results):
+            os.makedirs(subdirectory, exist_ok=True)
+
+    def _list(self, subdirectory):
+        """Return the names of the unit files in a subdirectory, in order."""
+
+        return sorted(
+            name for name in os.listdir(subdirectory) if name.endswith(".json")
+        )
+
+    def _unit_ids(self, subdirectory):
+        """Return the ids of the units in a subdirectory."""
+
+        return {name.split(".", 1)[0] for name in self._list(subdirectory)}
+
+    def write_settings(self, settings):
+        """Save the solve settings, see solve_file(), shared by all work units.
+
+        Parameters
+        ----------
+        settings : dict
+            The "method", "restarts", "verify", "triage", "seed_words" and
+            "score_cache_size" arguments to solve_file().
+        """
+
+        _write_json(os.path.join(self.directory, SETTINGS_NAME), settings)
+
+    def read_settings(self):
+        """Return the solve settings, or None if the queue is not filled yet."""
+
+        try:
+            with open(os.path.join(self.directory, SETTINGS_NAME)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def enqueue(self, paths):
+        """Add files to solve to the queue.
+
+        Files already in the queue, whether pending, claimed or solved, are skipped.
+
+        Parameters
+        ----------
+        paths : iterable
+            Paths of the files to solve, readable by all workers.
+
+        Returns
+        -------
+        num_enqueued : int
+            The number of files added.
+        """
+
+        queued_ids = (
+            self._unit_ids(self._pending)
+            | self._unit_ids(self._claimed)
+            | self._unit_ids(self._results)
+        )
+
+        num_enqueued = 0
+
+        for path in paths:
+            unit_id = hashlib.sha256(path.encode()).hexdigest()[:16]
+
+            if unit_id not in queued_ids:
+                _write_json(os.path.join(self._pending, f"{unit_id}.json"), path)
+                queued_ids.add(unit_id)
+                num_enqueued += 1
+
+        return num_enqueued
+
+    def claim(self, worker_id):
+        """Claim the next pending unit.
+
+        Parameters
+        ----------
+        worker_id : str
+            The claiming worker, see get_worker_id().
+
+        Returns
+        -------
+        claim : tuple
+            The unit id, the path of the claim file, and the path of the file to
+            solve, or None if there are no pending units.
+        """
+
+        for name in self._list(self._pending):
+            unit_id = name.split(".", 1)[0]
+            claim_path = os.path.join(self._claimed, f"{unit_id}.{worker_id}.json")
+
+            try:
+                os.rename(os.path.join(self._pending, name), claim_path)
+            except FileNotFoundError:
+                # Another worker claimed it first.
+                continue
+
+            # Renaming keeps the modification time of the pending unit, which may be
+            # old enough for the claim to look abandoned, so send a heartbeat at once.
+            if not self.heartbeat(claim_path):
+                continue
+
+            with open(claim_path) as f:
+                return unit_id, claim_path, json.load(f)
+
+        return None
+
+    def heartbeat(self, claim_path):
+        """Mark a claim as still being worked on.
+
+        Parameters
+        ----------
+        claim_path : str
+            The claim file returned by .claim().
+
+        Returns
+        -------
+        is_claimed : bool
+            False if the claim was considered abandoned and put back in the queue.
+        """
+
+        try:
+            os.utime(claim_path)
+        except FileNotFoundError:
+            return False
+
+        return True
+
+    def complete(self, unit_id, claim_path, result):
+        """Save the result of a claimed unit and release the claim.
+
+        Parameters
+        ----------
+        unit_id : str
+            The unit id returned by .claim().
+        claim_path : str
+            The claim file returned by .claim().
+        result : dict
+            The result from solve_file().
+        """
+
+        _write_json(os.path.join(self._results, f"{unit_id}.json"), result)
+
+        try:
+            os.remove(claim_path)
+        except FileNotFoundError:
+            # The claim was put back in the queue, which .requeue_stale() undoes
+            # now that there is a result.
+            pass
+
+    def requeue_stale(self, timeout=STALE_CLAIM_TIMEOUT):
+        """Put claims without a recent heartbeat back in the queue.
+
+        Parameters
+        ----------
+        timeout : float
+            Seconds without a heartbeat after which a claim is abandoned.
+
+        Returns
+        -------
+        num_requeued : int
+            The number of units put back in the queue.
+        """
+
+        solved_ids = self._unit_ids(self._results)
+        now = time.time()
+        num_requeued = 0
+
+        for name in self._list(self._claimed):
+            unit_id = name.split(".", 1)[0]
+            claim_path = os.path.join(self._claimed, name)
+
+            try:
+                if unit_id in solved_ids:
+                    os.remove(claim_path)
+                elif now - os.path.getmtime(claim_path) > timeout:
+                    os.rename(
+                        claim_path, os.path.join(self._pending, f"{unit_id}.json")
+                    )
+                    num_requeued += 1
+            except FileNotFoundError:
+                # The claim was completed or requeued meanwhile.
+                continue
+
+        return num_requeued
+
+    def counts(self):
+        """Return the number of "pending", "claimed" and solved "results" units."""
+
+        return {
+            "pending": len(self._list(self._pending)),
+            "claimed": len(self._list(self._claimed)),
+            "results": len(self._list(self._results)),
+        }
+
+    def is_done(self):
+        """Return whether all units are solved."""
+
+        # Units move between "pending" and "claimed" while they are listed, so look in
+        # "pending" again, which only misses a unit if it moved back and forth in
+        # the meantime.
+        return not (
+            self._list(self._pending)
+            or self._list(self._claimed)
+            or self._list(self._pending)
+        )
+
+    def merge(self, manifest, output_directory, root):
+        """Move solved results from the queue to a manifest.
+
+        Parameters
+        ----------
+        manifest : file object
+            The manifest to append results to, see open_manifest().
+        output_directory : str
+            The directory to write plaintexts to, or None to keep them in the
+            manifest, see record_result().
+        root : str
+            The directory that plaintext file paths are made relative to.
+
+        Returns
+        -------
+        results : list
+            The merged results.
+        """
+
+        results = []
+
+        for name in self._list(self._results):
+            result_path = os.path.join(self._results, name)
+
+            with open(result_path) as f:
+                result = json.load(f)
+
+            record_result(result, manifest, output_directory, root)
+            os.remove(result_path)
+            results.append(result)
+
+        return results
+
+
+def submit(
+    pattern,
+    queue_directory,
+    output,
+    method="random",
+    restarts=1,
+    verify=False,
+    triage=False,
+    seed_words=False,
+    score_cache_size=0,
+):
+    """Fill a work queue with all files matching a pattern that are not solved yet.
+
+    Parameters
+    ----------
+    pattern : str
+        A directory, which is searched recursively, or a glob pattern.
+    queue_directory : str
+        The shared queue directory.
+    output : str
+        The output that results are merged into, see run_batch(). Files already in
+        its manifest are not queued.
+    method : str
+        The solve method, see SimpleSolver.solve().
+    restarts : int
+        The maximum number of times to run the solver per file.
+    verify : bool
+        Whether to stop restarting as soon as a plaintext is verified.
+    triage : bool
+        Whether to skip files that are not plausibly substitutions of English, see
+        solve_file().
+    seed_words : bool
+        Whether to start solving from the letters implied by known words, see
+        solve_file().
+    score_cache_size : int
+        The number of key scores to remember per file, see solve_file().
+
+    Returns
+    -------
+    num_enqueued : int
+        The number of files added to the queue.
+    """
+
+    manifest_path, _ = get_output_paths(output)
+
+    completed_paths = read_manifest(manifest_path)
+    paths = [
+        path
+        for path in find_input_files(pattern, exclude=[output, queue_directory])
+        if path not in completed_paths
+    ]
+
+    queue = WorkQueue(queue_directory)
+    num_enqueued = queue.enqueue(paths)
+    queue.write_settings(
+        {
+            "method": method,
+            "restarts": restarts,
+            "verify": verify,
+            "triage": triage,
+            "seed_words": seed_words,
+            "score_cache_size": score_cache_size,
+        }
+    )
+
+    return num_enqueued
+
+
+def collect(
+    pattern,
+    queue_directory,
+    output,
+    stale_timeout=STALE_CLAIM_TIMEOUT,
+    report=None,
+    metrics=None,
+):
+    """Merge results from a work queue as they arrive, until all files are solved.
+
+    Abandoned claims are put back in the queue while waiting, so files being solved
+    by workers that stopped are picked up by others.
+
+    Parameters
+    ----------
+    pattern : str
+        The directory or glob pattern passed to submit().
+    queue_directory : str
+        The shared queue directory.
+    output : str
+        The output that results are merged into, see run_batch().
+    stale_timeout : float
+        Seconds without a heartbeat after which a claim is abandoned.
+    report : callable
+        Optional function called with a one-line progress summary whenever results
+        are merged, and once when done.
+    metrics : cipher_solver.metrics.SolverMetrics
+        Optional metrics to update with each result and the number of queued files.
+
+    Returns
+    -------
+    progress : BatchProgress
+        Statistics of the files merged.
+    """
+
+    manifest_path, output_directory = get_output_paths(output)
+
+    input_paths = find_input_files(pattern, exclude=[output, queue_directory])
+    root = os.path.commonpath([os.path.dirname(path) for path in input_paths] or ["."])
+
+    queue = WorkQueue(queue_directory)
+    counts = queue.counts()
+    progress = BatchProgress(sum(counts.values()))
+
+    with open_manifest(manifest_path) as manifest:
+        while True:
+            # Check before merging, so the results of the last units are merged too.
+            is_done = queue.is_done()
+
+            results = queue.merge(manifest, output_directory, root)
+            for result in results:
+                progress.add(result)
+
+                if metrics is not None:
+                    metrics.record(result)
+
+            if metrics is not None:
+                counts = queue.counts()
+                metrics.set_queue_depth(counts["pending"] + counts["claimed"])
+
+            if is_done:
+                break
+
+            if results and report is not None:
+                report(progress.report())
+
+            queue.requeue_stale(stale_timeout)
+            time.sleep(POLL_INTERVAL)
+
+    if report is not None:
+        report(progress.report())
+
+    return progress
+
+
+def _send_heartbeats(queue, claim_path, stop, interval):
+    """Send heartbeats for a claim every interval seconds until stop is set."""
+
+    while not stop.wait(interval):
+        queue.heartbeat(claim_path)
+
+
+def run_worker(
+    queue_directory,
+    worker_id=None,
+    model=None,
+    stale_timeout=STALE_CLAIM_TIMEOUT,
+    heartbeat_interval=HEARTBEAT_INTERVAL,
+    metrics=None,
+):
+    """Solve files from a work queue until all of them are solved.
+
+    The worker waits for the queue to be filled, see submit(), and keeps waiting
+    while files are claimed by other workers, so that it can take over those whose
+    workers stop sending heartbeats.
+
+    Parameters
+    ----------
+    queue_directory : str
+        The shared queue directory.
+    worker_id : str
+        The identifier of this worker. Defaults to get_worker_id().
+    model : mapping
+        Optional language model tables, see SimpleSolver.
+    stale_timeout : float
+        Seconds without a heartbeat after which a claim is abandoned.
+    heartbeat_interval : float
+        Seconds between heartbeats while solving a file.
+    metrics : cipher_solver.metrics.SolverMetrics
+        Optional metrics to update with each result and the number of queued files.
+
+    Returns
+    -------
+    num_solved : int
+        The number of files solved by this worker.
+    """
+
+    if worker_id is None:
+        worker_id = get_worker_id()
+
+    queue = WorkQueue(queue_directory)
+
+    settings = queue.read_settings()
+    while settings is None:
+        time.sleep(POLL_INTERVAL)
+        settings = queue.read_settings()
+
+    num_solved = 0
+
+    while True:
+        claim = queue.claim(worker_id)
+
+        if claim is None:
+            if queue.is_done():
+                break
+
+            if queue.requeue_stale(stale_timeout) == 0:
+                time.sleep(POLL_INTERVAL)
+            continue
+
+        unit_id, claim_path, path = claim
+
+        stop_heartbeat = threading.Event()
+
+        heartbeat_thread = threading.Thread(
+            target=_send_heartbeats,
+            args=(queue, claim_path, stop_heartbeat, heartbeat_interval),
+            daemon=True,
+        )
+        heartbeat_thread.start()
+
+        try:
+            result = solve_file(path, model=model, **settings)
+        finally:
+            stop_heartbeat.set()
+            heartbeat_thread.join()
+
+        queue.complete(unit_id, claim_path, result)
+        num_solved += 1
+
+        if metrics is not None:
+            metrics.record(result)
+            counts = queue.counts()
+            metrics.set_queue_depth(counts["pending"] + counts["claimed"])
+
+    return num_solved
+
+
+class _ForwardedMetrics:
+    """Metrics of a worker process, forwarded to the metrics of its parent process."""
+
+    def __init__(self, messages):
+        """Create new forwarder.
+
+        Parameters
+        ----------
+        messages : multiprocessing.Queue
+            The queue the parent process reads the updates from.
+        """
+
+        self._messages = messages
+
+    def record(self, result):
+        """Forward a result, see SolverMetrics.record()."""
+
+        self._messages.put(("record", result))
+
+    def set_queue_depth(self, depth):
+        """Forward the number of queued files, see SolverMetrics.set_queue_depth()."""
+
+        self._messages.put(("set_queue_depth", depth))
+
+
+def _record_forwarded_metrics(messages, processes, metrics, report):
+    """Update metrics from the worker processes until all of them have ended.
+
+    Parameters
+    ----------
+    messages : multiprocessing.Queue
+        The queue the workers forward their updates to, see _ForwardedMetrics.
+    processes : list
+        The worker processes.
+    metrics : cipher_solver.metrics.SolverMetrics
+        The metrics to update.
+    report : callable
+        Optional function called with a one-line progress summary at most every
+        PROGRESS_INTERVAL seconds, and once when done. The total is the number of
+        files solved on this node and the number still queued.
+    """
+
+    progress = BatchProgress(0)
+    last_report_time = time.perf_counter()
+
+    while True:
+        # Check before reading, so the last updates of the workers are read too.
+        is_running = any(process.is_alive() for process in processes)
+
+        try:
+            name, value = messages.get(timeout=POLL_INTERVAL)
+        except Empty:
+            if is_running:
+                continue
+            break
+
+        getattr(metrics, name)(value)
+
+        if name == "record":
+            progress.add(value)
+        else:
+            progress.total = len(progress.latencies) + value
+
+        now = time.perf_counter()
+        if report is not None and now - last_report_time >= PROGRESS_INTERVAL:
+            report(progress.report())
+            last_report_time = now
+
+    if report is not None:
+        report(progress.report())
+
+
+def run_workers(
+    queue_directory,
+    workers=None,
+    stale_timeout=STALE_CLAIM_TIMEOUT,
+    report=None,
+    metrics=None,
+):
+    """Run worker processes on this node until all files in a queue are solved.
+
+    The language model is published in shared memory once, for all worker processes
+    to use without copies of their own. With metrics, the workers send their results
+    to this process, which updates the metrics.
+
+    Parameters
+    ----------
+    queue_directory : str
+        The shared queue directory.
+    workers : int
+        The number of worker processes. Defaults to the number of CPUs.
+    stale_timeout : float
+        Seconds without a heartbeat after which a claim is abandoned.
+    report : callable
+        Optional function called with a one-line progress summary, see
+        _record_forwarded_metrics(). Only used with metrics.
+    metrics : cipher_solver.metrics.SolverMetrics
+        Optional metrics to update with each result of the workers and the number
+        of queued files.
+    """
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    messages = None
+    forwarded_metrics = None
+
+    if metrics is not None:
+        messages = multiprocessing.Queue()
+        forwarded_metrics = _ForwardedMetrics(messages)
+
+    with SharedModel.publish() as model:
+        processes = [
+            multiprocessing.Process(
+                target=run_worker,
+                args=(queue_directory,),
+                kwargs={
+                    "model": model,
+                    "stale_timeout": stale_timeout,
+                    "metrics": forwarded_metrics,
+                },
+            )
+            for _ in range(workers)
+        ]
+
+        for process in processes:
+            process.start()
+
+        if metrics is not None:
+            _record_forwarded_metrics(messages, processes, metrics, report)
+
+        for process in processes:
+            process.join()
@@ -23,9 +23,9 @@ setuptools.setup(
         "Programming Language :: Python",
         "Programming Language :: Python :: 3",
         "Programming Language :: Python :: 3 :: Only",
-        "Programming Language :: Python :: 3.6",
-        "Programming Language :: Python :: 3.7",
-        "Programming Language :: Python :: 3.8",
+        "Programming Language :: Python :: 3.11",
+        "Programming Language :: Python :: 3.12",
+        "Programming Language :: Python :: 3.13",
         "Topic :: Scientific/Engineering :: Information Analysis",
         "Topic :: Security :: Cryptography",
         "Topic :: Text Processing :: Linguistic",
@@ -37,7 +37,8 @@ setuptools.setup(
         "Tracker": "https://github.com/alimony/cipher_solver/issues",
     },
     packages=["cipher_solver"],
+    package_data={"cipher_solver": ["english_words.txt"]},
     install_requires=["numpy"],
-    python_requires=">=3.6",
+    python_requires=">=3.11",
     entry_points={"console_scripts": ["cipher_solver=cipher_solver.cli:main"]},
 )
@@ -1,21 +1,45 @@
+import asyncio
+import io
+import json
+import multiprocessing
+import os
+import pickle  # nosec:B403
 import random
+import re
+import tempfile
 import unittest
+import urllib.request
 from string import ascii_lowercase
 
 import numpy as np
 
+from cipher_solver.aio import solve_async
+from cipher_solver.batch import (
+    MANIFEST_NAME,
+    find_input_files,
+    read_manifest,
+    run_batch,
+    solve_file,
+)
 from cipher_solver.consts import (
     DIGRAM_MATRIX_ENGLISH,
     ENGLISH_LETTER_FREQUENCIES,
     ENGLISH_LETTERS_BY_FREQUENCY,
+    INDEX_PAIRS,
     STANDARD_ALPHABET_SIZE,
 )
-from cipher_solver.simple import SimpleSolver
+from cipher_solver.metrics import MetricsRegistry, SolverMetrics
+from cipher_solver.patterns import PatternIndex, word_pattern
+from cipher_solver.shared import SharedModel, english_tables, language_tables
+from cipher_solver.simple import KEY_POSITION_HASHES, SimpleSolver
+from cipher_solver.triage import MIN_TRIAGE_LETTERS, classify
 from cipher_solver.utils import (
     alphabetical_to_common_key,
     common_to_alphabetical_key,
     encrypt,
 )
+from cipher_solver.verify import WordVerifier
+from cipher_solver.workqueue import WorkQueue, collect, run_workers, submit
 
 
 class SimpleSolverTestCase(unittest.TestCase):
@@ -238,6 +262,82 @@ class SimpleSolverTestCase(unittest.TestCase):
             with self.assertRaises(ValueError):
                 s._swap_matrix(matrix, 0, 2)
 
+    def test_precision(self):
+        ciphertext = "qemeiqtxeeuktyuggjmtxesuktge"
+
+        for precision in ("float64", "float32", "scaled_int"):
+            s = SimpleSolver(ciphertext, precision=precision)
+            matrix = s._to_precision(s._get_digram_matrix(s.plaintext()))
+
+            # Swapping twice with a buffer restores the matrix.
+            original = np.copy(matrix)
+            buffer = np.empty(STANDARD_ALPHABET_SIZE, dtype=matrix.dtype)
+            s._swap_matrix(matrix, 2, 11, buffer=buffer)
+            self.assertFalse(np.array_equal(matrix, original))
+            s._swap_matrix(matrix, 2, 11, buffer=buffer)
+            self.assertTrue(np.array_equal(matrix, original))
+
+            s.solve()
+            s.solve(method="deterministic")
+
+        self.assertEqual(
+            SimpleSolver("foo", precision="scaled_int")._model_matrix.sum(),
+            round(DIGRAM_MATRIX_ENGLISH.sum() * 1000),
+        )
+
+        with self.assertRaises(ValueError):
+            SimpleSolver("foo", precision="float16")
+
+    def test_solve_random_exhausts_neighbourhood(self):
+        with open(
+            "texts/26_char_key/ciphertexts/ciphertext_frankenstein_1000_chars.txt"
+        ) as f:
+            s = SimpleSolver(f.read().strip())
+
+        s.solve()
+
+        # The random solver only stops once no single swap improves the key.
+        matrix = s._get_digram_matrix(s.plaintext())
+        best_score = s._score(matrix)
+
+        for a, b in INDEX_PAIRS:
+            s._swap_matrix(matrix, a, b)
+            self.assertGreaterEqual(s._score(matrix), best_score)
+            s._swap_matrix(matrix, a, b)
+
+    def test_score_cache(self):
+        with open(
+            "texts/26_char_key/ciphertexts/ciphertext_frankenstein_500_chars.txt"
+        ) as f:
+            ciphertext = f.read().strip()
+
+        # The hash of a swapped key can be updated from the hash of the key.
+        s = SimpleSolver(ciphertext, score_cache_size=100)
+        key = s._decryption_key[:]
+        key_hash = s._get_key_hash(key)
+        key[3], key[7] = key[7], key[3]
+        self.assertNotEqual(s._get_key_hash(key), key_hash)
+        self.assertEqual(
+            s._get_key_hash(key),
+            key_hash
+            ^ KEY_POSITION_HASHES[3][key[3]]
+            ^ KEY_POSITION_HASHES[7][key[7]]
+            ^ KEY_POSITION_HASHES[3][key[7]]
+            ^ KEY_POSITION_HASHES[7][key[3]],
+        )
+
+        # Cached scores give the same results as scoring every key.
+        keys = []
+        for score_cache_size in (0, 100, 100000):
+            s = SimpleSolver(ciphertext, score_cache_size=score_cache_size)
+            random.seed(1)
+            s.solve(restarts=3)
+            keys.append(s._decryption_key)
+            self.assertLessEqual(len(s._score_cache), score_cache_size)
+
+        self.assertEqual(keys[0], keys[1])
+        self.assertEqual(keys[0], keys[2])
+
     def test_get_plaintext(self):
         items = (
             (
@@ -273,6 +373,39 @@ class SimpleSolverTestCase(unittest.TestCase):
         with self.assertRaises(ValueError):
             s._get_plaintext(ascii_lowercase[1:])
 
+    def test_streaming_plaintext(self):
+        path = "texts/26_char_key/ciphertexts/ciphertext_frankenstein_1000_chars.txt"
+        with open(path) as f:
+            ciphertext = f.read()
+
+        s = SimpleSolver(ciphertext[:300])
+        s.solve()
+
+        # Decrypting in chunks gives the same plaintext as decrypting all at once.
+        for chunk_size in (1, 7, 300, 10000):
+            chunks = list(s.iter_plaintext(chunk_size))
+            self.assertEqual("".join(chunks), s.plaintext())
+            self.assertTrue(all(len(chunk) <= chunk_size for chunk in chunks))
+
+        # A larger ciphertext can be streamed from a file, or file object.
+        expected_plaintext = SimpleSolver(ciphertext)._get_plaintext(s._decryption_key)
+        self.assertEqual("".join(s.iter_plaintext(64, path)), expected_plaintext)
+
+        with open(path) as f:
+            output = io.StringIO()
+            s.write_plaintext(output, 64, ciphertext_file=f)
+            self.assertEqual(output.getvalue(), expected_plaintext)
+
+        with tempfile.TemporaryDirectory() as directory:
+            output_path = os.path.join(directory, "plaintext.txt")
+            s.write_plaintext(output_path)
+
+            with open(output_path) as f:
+                self.assertEqual(f.read(), s.plaintext())
+
+        with self.assertRaises(ValueError):
+            s.iter_plaintext(0)
+
     def test_public_api(self):
         s = SimpleSolver("qemeiqtxeeuktyuggjmtxesuktge")
 
@@ -298,6 +431,254 @@ class SimpleSolverTestCase(unittest.TestCase):
         # Use the original key swap method.
         s.solve(method="deterministic")
 
+    def test_restarts(self):
+        s = SimpleSolver("qemeiqtxeeuktyuggjmtxesuktge")
+
+        s.solve(restarts=3)
+        self.assertEqual(len(set(s._decryption_key)), STANDARD_ALPHABET_SIZE)
+
+        # A verifier that accepts anything stops after the first run.
+        runs = []
+        solve_random = s._solve_random
+        s._solve_random = lambda: runs.append(1) or solve_random()
+        s.solve(restarts=5, verifier=WordVerifier(threshold=0))
+        self.assertEqual(len(runs), 1)
+
+        # Work is counted over all runs of the last solve.
+        statistics = s.statistics()
+        self.assertEqual(statistics["runs"], 1)
+        self.assertGreaterEqual(statistics["iterations"], statistics["swaps_evaluated"])
+        self.assertGreater(statistics["swaps_evaluated"], statistics["swaps_accepted"])
+
+        with self.assertRaises(ValueError):
+            s.solve(restarts=0)
+
+        # The best run is picked by the model the solver uses, not by English.
+        with open(
+            "texts/26_char_key/plaintexts/plaintext_frankenstein_10000_chars.txt"
+        ) as f:
+            sample = f.read()
+
+        model = language_tables(
+            re.sub("[a-z]+", lambda m: m.group(0)[::-1], sample, flags=re.I)
+        )
+        s = SimpleSolver(sample[:300], model=model)
+
+        run_scores = []
+        solve_random = s._solve_random
+
+        def solve_and_score():
+            solve_random()
+            digram_matrix = s._get_digram_matrix(s.plaintext())
+            run_scores.append(s._score(digram_matrix, model["digram_matrix"]))
+
+        s._solve_random = solve_and_score
+        s.solve(restarts=4)
+        best_score = s._score(
+            s._get_digram_matrix(s.plaintext()), model["digram_matrix"]
+        )
+        self.assertEqual(len(run_scores), 4)
+        self.assertEqual(best_score, min(run_scores))
+
+    def test_candidates(self):
+        with open(
+            "texts/26_char_key/ciphertexts/ciphertext_frankenstein_500_chars.txt"
+        ) as f:
+            s = SimpleSolver(f.read().strip())
+
+        for method in ("random", "deterministic"):
+            s.reset()
+            s.solve(method=method, num_candidates=5)
+            candidates = s.candidates()
+
+            self.assertEqual(len(candidates), 5)
+            self.assertEqual(len({key for key, _ in candidates}), 5)
+            self.assertAlmostEqual(sum(confidence for _, confidence in candidates), 1)
+
+            # The solution is the best candidate.
+            self.assertEqual(candidates[0][0], s.decryption_key())
+            confidences = [confidence for _, confidence in candidates]
+            self.assertEqual(confidences, sorted(confidences, reverse=True))
+
+            # Every ambiguous letter has confidences summing to one.
+            for letter_confidences in s.ambiguous_letters().values():
+                self.assertGreater(len(letter_confidences), 1)
+                self.assertAlmostEqual(sum(letter_confidences.values()), 1)
+
+        s.solve()
+        self.assertEqual(s.candidates(), [(s.decryption_key(), 1.0)])
+        self.assertEqual(s.ambiguous_letters(), {})
+
+        with self.assertRaises(ValueError):
+            s.solve(num_candidates=0)
+
+    def test_compound_moves(self):
+        with open(
+            "texts/26_char_key/ciphertexts/ciphertext_frankenstein_500_chars.txt"
+        ) as f:
+            s = SimpleSolver(f.read().strip())
+
+        key = s._decryption_key[:]
+        digram_matrix = s._get_digram_matrix(s._get_plaintext(key))
+        score = s._score(digram_matrix)
+
+        # Batched deltas equal the change in score of the moved key.
+        for move_type in ("3-cycle", "double-swap"):
+            positions, sources = next(s._get_compound_moves(move_type))
+            deltas = s._score_moves(digram_matrix, positions, sources)
+
+            for move in range(0, len(positions), 97):
+                moved_key = key[:]
+                for position, source in zip(positions[move], sources[move]):
+                    moved_key[position] = key[source]
+
+                moved_matrix = s._get_digram_matrix(s._get_plaintext(moved_key))
+                self.assertAlmostEqual(s._score(moved_matrix) - score, deltas[move])
+
+        # Compound moves can only improve on the single swap local minimum.
+        s.solve(method="deterministic")
+        swap_score = s._score(s._get_digram_matrix(s.plaintext()))
+        s.reset()
+        s.solve(method="deterministic", compound_moves=("3-cycle", "double-swap"))
+        compound_score = s._score(s._get_digram_matrix(s.plaintext()))
+        self.assertLess(compound_score, swap_score)
+
+        s.solve(compound_moves=("3-cycle",))
+        self.assertEqual(len(set(s._decryption_key)), STANDARD_ALPHABET_SIZE)
+
+        with self.assertRaises(ValueError):
+            s.solve(compound_moves=("block",))
+
+    def test_pins(self):
+        with open(
+            "texts/26_char_key/ciphertexts/ciphertext_frankenstein_200_chars.txt"
+        ) as f:
+            ciphertext = f.read().strip()
+
+        with open(
+            "texts/26_char_key/plaintexts/plaintext_frankenstein_200_chars.txt"
+        ) as f:
+            plaintext = f.read().strip()
+
+        crib = plaintext[:15]
+        s = SimpleSolver(ciphertext, cribs=[(crib, 0)])
+
+        # The initial key and every solution decrypt the crib.
+        self.assertEqual(s.plaintext()[:15], crib)
+        num_pins = len(s._pins)
+        self.assertEqual(len(s._index_pairs), (26 - num_pins) * (25 - num_pins) // 2)
+
+        for method in ("random", "deterministic"):
+            s.reset()
+            s.solve(method=method, compound_moves=("3-cycle", "double-swap"))
+            self.assertEqual(s.plaintext()[:15], crib)
+            self.assertEqual(len(set(s._decryption_key)), STANDARD_ALPHABET_SIZE)
+
+        # A partial key pins the same way, so "a" and "b" decrypt to "e" and "t".
+        partial_key = "....a" + "." * 14 + "b" + "." * 6
+        s = SimpleSolver("abba cab", partial_key=partial_key)
+        self.assertEqual(s.plaintext()[:4], "ette")
+        s.solve()
+        self.assertEqual(s.plaintext()[:4], "ette")
+
+        # Everything pinned leaves nothing to search.
+        s = SimpleSolver(ciphertext, partial_key=s.decryption_key())
+        key = s.decryption_key()
+        s.solve()
+        self.assertEqual(s.decryption_key(), key)
+
+        invalid_arguments = [
+            {"partial_key": "abc"},
+            {"partial_key": "!" * 26},
+            {"cribs": [("the", len(ciphertext))]},
+            {"cribs": [("t e", 0)]},
+            {"cribs": [("aa", 0)]},
+            {"partial_key": "x" + "." * 25, "cribs": [("b", 0)]},
+        ]
+        for kwargs in invalid_arguments:
+            with self.assertRaises(ValueError):
+                SimpleSolver("xy" + ciphertext, **kwargs)
+
+    def test_identify_language(self):
+        with open(
+            "texts/26_char_key/plaintexts/plaintext_frankenstein_10000_chars.txt"
+        ) as f:
+            sample = f.read()
+
+        with open(
+            "texts/26_char_key/plaintexts/plaintext_frankenstein_2000_chars.txt"
+        ) as f:
+            plaintext = f.read().strip()
+
+        # Model tables from a sample text are the digram matrix of the sample.
+        s = SimpleSolver(plaintext)
+        tables = language_tables(sample)
+        self.assertTrue(
+            np.allclose(tables["digram_matrix"], s._get_digram_matrix(sample))
+        )
+        self.assertEqual(tables["random_index_distribution"][0], 0)
+        with self.assertRaises(ValueError):
+            language_tables("a b")
+
+        # English with each word backwards has the same letter frequencies, but its
+        # digrams are reversed.
+        def reverse_words(text):
+            return re.sub("[a-z]+", lambda m: m.group(0)[::-1], text, flags=re.I)
+
+        models = {
+            "english": english_tables(),
+            "backwards": language_tables(reverse_words(sample)),
+        }
+
+        key = "jhdxmuvpltbwnayzscrefqogik"
+        for language, text in (
+            ("english", plaintext),
+            ("backwards", reverse_words(plaintext)),
+        ):
+            s = SimpleSolver(
+                encrypt(text, key), cribs=[(text[:3], 0)], score_cache_size=100
+            )
+            s._score_cache[0] = 0.0
+            self.assertEqual(s.identify_language(models), language)
+            self.assertNotIn(0, s._score_cache)
+            self.assertTrue(
+                np.array_equal(s._model_matrix, models[language]["digram_matrix"])
+            )
+            self.assertEqual(s.plaintext()[:3], text[:3])
+
+            s.solve()
+            correct = [a == b for a, b in zip(s.plaintext(), text) if b.isalpha()]
+            self.assertGreater(sum(correct) / len(correct), 0.9)
+
+        # Swaps are drawn, and tried in order, by the letter frequencies of the model
+        # in use, here of English with every letter shifted by one, without the
+        # pinned positions.
+        model = language_tables(encrypt(sample, ascii_lowercase[1:] + "a"))
+        for cribs in (None, [(plaintext[:3], 0)]):
+            s = SimpleSolver(plaintext, model=model, cribs=cribs)
+
+            counts = np.bincount(
+                s._random_index_distribution, minlength=STANDARD_ALPHABET_SIZE
+            )
+            num_indices = counts.sum()
+            pair_probabilities = (
+                2 * np.outer(counts, counts) / (num_indices * (num_indices - 1))
+            )
+            np.fill_diagonal(pair_probabilities, 0)
+
+            self.assertTrue(np.allclose(s._pair_probabilities, pair_probabilities))
+            self.assertEqual(s._index_pairs[-1], tuple(sorted(np.argsort(-counts)[:2])))
+            self.assertEqual(
+                sorted(s._three_cycle_positions[0]), sorted(np.argsort(-counts)[:3])
+            )
+            self.assertEqual(counts[list(s._pins)].sum(), 0)
+
+        with self.assertRaises(ValueError):
+            s.identify_language({})
+
+        with self.assertRaises(ValueError):
+            s.identify_language({"tiny": {"digram_matrix": np.zeros((2, 2))}})
+
     def test_matrix_key_swap(self):
         # The algorithm is based on the premise that if a digram matrix is created from
         # a plaintext using a certain key, swapping the letters at index (a, b) in that
@@ -335,3 +716,484 @@ class SimpleSolverTestCase(unittest.TestCase):
                 # and the new matrix that was generated from plaintext using the key
                 # in which we swapped the letters at the same index.
                 self.assertTrue(np.allclose(matrix1, matrix2))
+
+
+class AsyncSolveTestCase(unittest.IsolatedAsyncioTestCase):
+    async def test_solve_async(self):
+        with open(
+            "texts/26_char_key/ciphertexts/ciphertext_frankenstein_2000_chars.txt"
+        ) as f:
+            ciphertext = f.read().strip()
+
+        s = SimpleSolver(ciphertext)
+        solving = solve_async(s, method="deterministic")
+        events = [event async for event in solving]
+        self.assertEqual(await solving, s.decryption_key())
+        self.assertFalse(solving.cancelled())
+        self.assertEqual(events[0]["run"], 1)
+        self.assertEqual(events[0]["iterations"], 0)
+
+        # Cancelling stops the search at the next progress check.
+        s = SimpleSolver(ciphertext)
+        solving = solve_async(s, restarts=1000)
+        async for event in solving:
+            self.assertGreater(event["iterations"], 0)
+            solving.cancel()
+
+        self.assertTrue(solving.cancelled())
+        self.assertLess(s.statistics().get("runs", 0), 1000)
+        with self.assertRaises(asyncio.CancelledError):
+            await solving
+
+        # Leaving the block cancels a solve that is not done.
+        async with solve_async(s, restarts=1000) as solving:
+            pass
+        self.assertTrue(solving.cancelled())
+
+        # So does cancelling the task awaiting it.
+        solving = solve_async(s, restarts=1000)
+        task = asyncio.ensure_future(solving.result())
+        await asyncio.sleep(0)
+        task.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+        await asyncio.wait([solving._future])
+        self.assertTrue(solving.cancelled())
+
+
+class WordVerifierTestCase(unittest.TestCase):
+    def test_score(self):
+        v = WordVerifier(["defend", "the", "east", "wall", "of", "castle"])
+
+        # Text with word boundaries is scored by the fraction of known words.
+        self.assertEqual(v.score("Defend the east wall of the castle!"), 1.0)
+        self.assertEqual(v.score("Defend the west wall"), 0.75)
+
+        # Text without is scored by the fraction of letters covered by known words of
+        # at least three letters.
+        self.assertEqual(v.score("defendtheeastwallofthecastle"), 26 / 28)
+        self.assertEqual(v.score("xxxxdefendxxxx"), 6 / 14)
+
+        self.assertEqual(v.score(""), 0.0)
+        self.assertEqual(v.score("123"), 0.0)
+
+    def test_verify(self):
+        v = WordVerifier()
+
+        with open(
+            "texts/26_char_key/plaintexts/plaintext_frankenstein_500_chars.txt"
+        ) as f:
+            plaintext = f.read().strip()
+
+        with open(
+            "texts/26_char_key/ciphertexts/ciphertext_frankenstein_500_chars.txt"
+        ) as f:
+            ciphertext = f.read().strip()
+
+        # The default word list recognizes English with and without word boundaries.
+        self.assertTrue(v.verify(plaintext))
+        self.assertTrue(v.verify("".join(c for c in plaintext if c.isalpha())))
+        self.assertFalse(v.verify(ciphertext))
+
+        # So it does for text outside the corpus, but not once two of its most common
+        # letters are swapped.
+        with open("LICENSE") as f:
+            plaintext = f.read()
+
+        swapped = encrypt(plaintext, "abcdtfghijklmnopqrseuvwxyz")
+        for text in (plaintext, swapped):
+            letters = "".join(c for c in text if c.isalpha())
+            self.assertEqual(v.verify(text), text == plaintext)
+            self.assertEqual(v.verify(letters), text == plaintext)
+
+        with self.assertRaises(ValueError):
+            WordVerifier(threshold=1.5)
+
+
+class PatternIndexTestCase(unittest.TestCase):
+    def test_word_pattern(self):
+        self.assertEqual(word_pattern("letter"), "abccbd")
+        self.assertEqual(word_pattern("the"), "abc")
+        self.assertEqual(word_pattern(""), "")
+
+        index = PatternIndex(["Letter", "better", "cat", "dog", "see", "it's"])
+        self.assertEqual(index.words("abccbd"), ["better", "letter"])
+        self.assertEqual(index.words("abc"), ["cat", "dog"])
+        self.assertEqual(index.words("abcd"), [])
+
+    def test_seed_letters(self):
+        index = PatternIndex(["defend", "the", "east", "wall", "of", "castle"])
+        key = "jhdxmuvpltbwnayzscrefqogik"
+        ciphertext = encrypt("Defend the east wall of the castle!", key)
+
+        # Only the letters that at least two words agree on are found, since any
+        # single word might be an unknown one with the pattern of a known one.
+        seeds = index.seed_letters(ciphertext)
+        self.assertEqual(seeds, {key[ascii_lowercase.index(c)]: c for c in "eatsfl"})
+        self.assertEqual(index.seed_letters(encrypt("castle", key)), {})
+
+        # Without word boundaries, or with unknown words, nothing follows.
+        self.assertEqual(index.seed_letters(ciphertext.replace(" ", "")), {})
+        self.assertEqual(index.seed_letters(encrypt("xyzzy", key)), {})
+        self.assertEqual(index.seed_letters(""), {})
+
+        with open(
+            "texts/26_char_key/ciphertexts/ciphertext_frankenstein_2000_chars.txt"
+        ) as f:
+            ciphertext = f.read().strip()
+
+        with open(
+            "texts/26_char_key/plaintexts/plaintext_frankenstein_2000_chars.txt"
+        ) as f:
+            plaintext = f.read().strip()
+
+        def accuracy(s):
+            correct = [a == b for a, b in zip(s.plaintext(), plaintext) if b.isalpha()]
+            return sum(correct) / len(correct)
+
+        # With the default word list, most letters are found, and the initial key is
+        # much closer to the solution than from letter frequencies alone.
+        s = SimpleSolver(ciphertext, pattern_index=PatternIndex())
+        self.assertGreaterEqual(len(s._seeds), 20)
+        self.assertGreater(accuracy(s), 0.8)
+        self.assertLess(accuracy(SimpleSolver(ciphertext)), 0.5)
+
+        s.solve()
+        self.assertEqual(s.plaintext(), plaintext)
+
+        # Pins take precedence over seeds, here swapping two seeded letters.
+        s = SimpleSolver(ciphertext, cribs=[("Yuo", 0)], pattern_index=PatternIndex())
+        self.assertEqual(s.plaintext()[:3], "Yuo")
+        self.assertEqual(len(set(s._decryption_key)), STANDARD_ALPHABET_SIZE)
+
+        # The word list is not biased towards the corpus: the letters found for a
+        # text outside it are correct too.
+        with open("LICENSE") as f:
+            plaintext = f.read()
+
+        s = SimpleSolver(encrypt(plaintext, key), pattern_index=PatternIndex())
+        self.assertGreaterEqual(len(s._seeds), 10)
+        for position, cipher_letter in s._seeds.items():
+            plain_letter = ENGLISH_LETTERS_BY_FREQUENCY[position]
+            self.assertEqual(cipher_letter, key[ascii_lowercase.index(plain_letter)])
+
+        # Seeds that move the initial key away from the language are dropped, here
+        # from words that fit the patterns but imply the letters of another key.
+        words = re.findall("[a-z]+", encrypt(plaintext.lower(), ascii_lowercase[::-1]))
+        index = PatternIndex(words)
+        self.assertTrue(index.seed_letters(encrypt(plaintext, key)))
+        s = SimpleSolver(encrypt(plaintext, key), pattern_index=index)
+        self.assertEqual(s._seeds, {})
+
+
+class TriageTestCase(unittest.TestCase):
+    def test_classify(self):
+        # Every text in the corpus is plausible, and all long enough ones are
+        # recognized as substitutions.
+        for path in find_input_files("texts"):
+            with open(path) as f:
+                classification = classify(f.read())
+
+            self.assertTrue(classification["plausible"])
+            if classification["letters"] >= MIN_TRIAGE_LETTERS:
+                self.assertEqual(classification["label"], "substitution")
+
+        with open(
+            "texts/26_char_key/plaintexts/plaintext_frankenstein_2000_chars.txt"
+        ) as f:
+            plaintext = f.read().strip().lower()
+
+        rng = random.Random(0)  # nosec:B311
+        letters = "".join(c for c in plaintext if c in ascii_lowercase)
+
+        # Columnar transposition with 7 columns.
+        transposition = "".join(letters[i::7] for i in (3, 0, 6, 2, 5, 1, 4))
+
+        # Vigenere cipher with a 5 letter key.
+        shifts = [rng.randrange(26) for _ in range(5)]
+        vigenere = "".join(
+            ascii_lowercase[(ascii_lowercase.index(c) + shifts[i % 5]) % 26]
+            for i, c in enumerate(letters)
+        )
+
+        noise = "".join(rng.choice(ascii_lowercase) for _ in letters)
+
+        expected_labels = [
+            (encrypt(plaintext, "jhdxmuvpltbwnayzscrefqogik"), "substitution"),
+            (transposition, "transposition"),
+            (vigenere, "polyalphabetic"),
+            (noise, "random"),
+            (noise[:100], "too_short"),
+        ]
+        for text, label in expected_labels:
+            classification = classify(text)
+            self.assertEqual(classification["label"], label)
+            self.assertEqual(
+                classification["plausible"], label in ("substitution", "too_short")
+            )
+
+        self.assertEqual(classify("")["letters"], 0)
+
+    def test_solve_file_triage(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "noise.txt")
+            rng = random.Random(0)  # nosec:B311
+            with open(path, "w") as f:
+                f.write("".join(rng.choice(ascii_lowercase) for _ in range(1000)))
+
+            result = solve_file(path, triage=True)
+            self.assertEqual(result["skipped"], "random")
+            self.assertNotIn("plaintext", result)
+
+            # Without triage, it is solved anyway.
+            self.assertIn("plaintext", solve_file(path))
+
+        result = solve_file(
+            "texts/26_char_key/ciphertexts/ciphertext_frankenstein_500_chars.txt",
+            triage=True,
+        )
+        self.assertEqual(result["triage"]["label"], "substitution")
+        self.assertIn("plaintext", result)
+
+
+class BatchTestCase(unittest.TestCase):
+    def test_run_batch(self):
+        pattern = (
+            "texts/26_char_key/ciphertexts/ciphertext_frankenstein_[1-3]00_chars.txt"
+        )
+        paths = find_input_files(pattern)
+        self.assertEqual(len(paths), 3)
+
+        with tempfile.TemporaryDirectory() as directory:
+            # Write plaintext files to a directory.
+            output = os.path.join(directory, "output")
+            reports = []
+            progress = run_batch(pattern, output, workers=2, report=reports.append)
+
+            self.assertEqual(len(progress.latencies), 3)
+            self.assertEqual(set(progress.latency_percentiles()), {50, 90, 99})
+            self.assertTrue(reports[-1].startswith("3/3 files"))
+
+            with open(os.path.join(output, MANIFEST_NAME)) as f:
+                results = [json.loads(line) for line in f]
+
+            self.assertEqual(sorted(result["path"] for result in results), paths)
+
+            for result in results:
+                with open(result["path"]) as f, open(result["output_path"]) as g:
+                    self.assertEqual(len(f.read().strip()), len(g.read()))
+
+            # Running again skips files that are already done.
+            progress = run_batch(pattern, output, workers=2)
+            self.assertEqual(progress.total, 0)
+
+            # Write everything to a JSON lines file, resuming after an interrupted run.
+            output = os.path.join(directory, "results.jsonl")
+            with open(output, "w") as f:
+                f.write(json.dumps({"path": paths[0]}) + '\n{"path": "interr')
+
+            progress = run_batch(pattern, output, workers=1)
+            self.assertEqual(progress.total, 2)
+
+            with open(output) as f:
+                lines = f.read().splitlines()
+
+            self.assertIn("plaintext", json.loads(lines[-1]))
+            self.assertEqual(read_manifest(output), set(paths))
+
+            # The work queue recognizes the files solved by a batch run.
+            queue_directory = os.path.join(directory, "queue")
+            self.assertEqual(submit(pattern, queue_directory, output), 0)
+
+            # An output inside the input directory is never taken for input.
+            input_directory = os.path.join(directory, "input")
+            os.makedirs(input_directory)
+            with open(paths[0]) as f, open(
+                os.path.join(input_directory, "ciphertext.txt"), "w"
+            ) as g:
+                g.write(f.read())
+
+            output = os.path.join(input_directory, "output")
+            self.assertEqual(run_batch(input_directory, output, workers=1).total, 1)
+            self.assertEqual(run_batch(input_directory, output, workers=1).total, 0)
+            self.assertEqual(len(read_manifest(os.path.join(output, MANIFEST_NAME))), 1)
+
+            # Files that could not be solved are tried again, here one that was still
+            # empty when first found.
+            input_directory = os.path.join(directory, "unsolved")
+            os.makedirs(input_directory)
+            input_path = os.path.join(input_directory, "ciphertext.txt")
+            with open(input_path, "w"):
+                pass
+
+            output = os.path.join(directory, "unsolved.jsonl")
+            self.assertEqual(
+                run_batch(input_directory, output, workers=1).num_errors, 1
+            )
+            self.assertEqual(read_manifest(output), set())
+
+            with open(paths[0]) as f, open(input_path, "w") as g:
+                g.write(f.read())
+
+            self.assertEqual(submit(input_directory, queue_directory, output), 1)
+            self.assertEqual(run_batch(input_directory, output, workers=1).total, 1)
+            self.assertEqual(read_manifest(output), {input_path})
+
+
+def _sum_digram_matrix(model):
+    return float(model["digram_matrix"].sum())
+
+
+class WorkQueueTestCase(unittest.TestCase):
+    def test_work_queue(self):
+        pattern = (
+            "texts/26_char_key/ciphertexts/ciphertext_frankenstein_[1-3]00_chars.txt"
+        )
+        paths = [os.path.abspath(path) for path in find_input_files(pattern)]
+
+        with tempfile.TemporaryDirectory() as directory:
+            queue_directory = os.path.join(directory, "queue")
+            output = os.path.join(directory, "results.jsonl")
+
+            self.assertEqual(submit(pattern, queue_directory, output), 3)
+            self.assertEqual(submit(pattern, queue_directory, output), 0)
+
+            # A worker that claims a file and stops sending heartbeats.
+            queue = WorkQueue(queue_directory)
+            _, claim_path, _ = queue.claim("stopped-worker")
+            os.utime(claim_path, (0, 0))
+            self.assertEqual(queue.counts()["claimed"], 1)
+
+            metrics = SolverMetrics()
+            reports = []
+            run_workers(
+                queue_directory, workers=2, report=reports.append, metrics=metrics
+            )
+            self.assertTrue(queue.is_done())
+            self.assertFalse(os.path.exists(claim_path))
+
+            # The workers' results are recorded in the metrics of their parent.
+            text = metrics.registry.render()
+            self.assertIn("cipher_solver_solves_total 3\n", text)
+            self.assertIn("cipher_solver_queue_depth 0\n", text)
+            self.assertTrue(reports[-1].startswith("3/3 files"))
+
+            progress = collect(pattern, queue_directory, output)
+            self.assertEqual(len(progress.latencies), 3)
+
+            with open(output) as f:
+                results = [json.loads(line) for line in f]
+
+            self.assertEqual(sorted(result["path"] for result in results), paths)
+            self.assertTrue(all("plaintext" in result for result in results))
+
+            # Merged results are not queued again.
+            self.assertEqual(submit(pattern, queue_directory, output), 0)
+
+
+class MetricsTestCase(unittest.TestCase):
+    def test_registry(self):
+        registry = MetricsRegistry()
+        registry.counter("solves_total", "Solves.").inc(3)
+        registry.gauge("queue_depth", "Queued files.").set(7)
+        histogram = registry.histogram("seconds", "Latency.", buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 0.5, 2.0):
+            histogram.observe(value)
+
+        text = registry.render()
+        self.assertIn("# TYPE solves_total counter\nsolves_total 3\n", text)
+        self.assertIn("queue_depth 7\n", text)
+        self.assertIn('seconds_bucket{le="0.1"} 1\n', text)
+        self.assertIn('seconds_bucket{le="1.0"} 3\n', text)
+        self.assertIn('seconds_bucket{le="+Inf"} 4\n', text)
+        self.assertIn("seconds_sum 3.05\nseconds_count 4\n", text)
+
+        # The same name returns the same metric, but not as another type.
+        self.assertIs(
+            registry.counter("solves_total", "Solves."),
+            registry._metrics["solves_total"],
+        )
+        with self.assertRaises(ValueError):
+            registry.gauge("solves_total", "Solves.")
+        with self.assertRaises(ValueError):
+            registry.counter("solves_total", "Solves.").inc(-1)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "solver.prom")
+            registry.write(path)
+            with open(path) as f:
+                self.assertEqual(f.read(), text)
+
+        server = registry.serve(0)
+        try:
+            url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+            with urllib.request.urlopen(url) as response:  # nosec:B310
+                self.assertEqual(response.read().decode(), text)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def test_solver_metrics(self):
+        metrics = SolverMetrics()
+        pattern = (
+            "texts/26_char_key/ciphertexts/ciphertext_frankenstein_[1-3]00_chars.txt"
+        )
+
+        with tempfile.TemporaryDirectory() as directory:
+            run_batch(
+                pattern,
+                os.path.join(directory, "results.jsonl"),
+                restarts=3,
+                score_cache_size=10000,
+                workers=2,
+                metrics=metrics,
+            )
+
+        text = metrics.registry.render()
+        self.assertIn("cipher_solver_solves_total 3\n", text)
+        self.assertIn("cipher_solver_solve_seconds_count 3\n", text)
+        self.assertIn("cipher_solver_queue_depth 0\n", text)
+        self.assertGreater(metrics._statistics["swaps_evaluated"].value, 0)
+        self.assertGreater(metrics._statistics["iterations"].value, 0)
+        self.assertLessEqual(metrics._accept_rate.value, 1)
+
+        # Restarts from the same initial key find its neighbours in the score cache.
+        self.assertGreater(metrics._statistics["cache_hits"].value, 0)
+        self.assertGreater(metrics._cache_hit_rate.value, 0)
+
+
+class SharedModelTestCase(unittest.TestCase):
+    def test_shared_model(self):
+        with SharedModel.publish() as model:
+            self.assertTrue(
+                np.array_equal(model["digram_matrix"], DIGRAM_MATRIX_ENGLISH)
+            )
+
+            # Unpickling attaches to the same memory, read-only.
+            attached = pickle.loads(pickle.dumps(model))  # nosec:B301
+            self.assertTrue(
+                np.array_equal(attached["digram_matrix"], DIGRAM_MATRIX_ENGLISH)
+            )
+            with self.assertRaises(ValueError):
+                attached["digram_matrix"][0, 0] = 1
+
+            # Solvers use the shared tables without copying them.
+            s = SimpleSolver("qemeiqtxeeuktyuggjmtxesuktge", model=attached)
+            self.assertTrue(
+                np.shares_memory(s._model_matrix, attached["digram_matrix"])
+            )
+            s.solve()
+            del s
+
+            with multiprocessing.Pool(1) as pool:
+                self.assertAlmostEqual(
+                    pool.apply(_sum_digram_matrix, (model,)),
+                    DIGRAM_MATRIX_ENGLISH.sum(),
+                )
+
+            attached.close()
+            name, layout = model.__reduce__()[1]
+
+        # The memory is removed when the publishing process closes the model.
+        with self.assertRaises(FileNotFoundError):
+            SharedModel.attach(name, layout)